@@ -8,4 +8,6 @@ admin.site.register(Category)
 admin.site.register(Listing)
 admin.site.register(Comment)
 admin.site.register(Bid)
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(Notification)
+admin.site.register(ArchivedBid)
+admin.site.register(ProxyBid)
\ No newline at end of file
@@ -0,0 +1,292 @@
+"""
+Version 1 of the JSON API.
+
+Every endpoint requires a logged-in session and answers JSON, errors
+included (``{"error": "..."}``). Rows are serialized straight from
+``.values()`` querysets, so no model instances are built: a page of
+listings costs one query and one pass of the JSON encoder.
+
+Listing endpoints take ``fields`` (a comma separated subset of
+LISTING_FIELDS; ``id`` is always included) to keep responses small.
+Lists are paginated with the same opaque cursors as the HTML feeds and
+return ``next``/``previous`` cursors; ``limit`` sets the page size, up to
+MAX_PAGE_SIZE.
+
+Endpoints:
+- GET api/v1/listings: Active listings, newest first; ``category`` and
+  ``active`` filter them.
+- GET api/v1/listings/batch?ids=1,2,3: Up to MAX_BATCH_SIZE listings in
+  one query, in the requested order, plus the ids that do not exist.
+- GET api/v1/listings/<id>: One listing.
+- GET api/v1/listings/<id>/bids: Bid history, newest first, read from
+  the archive once the listing's bids were archived.
+- GET api/v1/listings/<id>/comments: Comments, newest first.
+- POST api/v1/bids: Up to MAX_BULK_BIDS bids from a JSON body
+  ``{"bids": [{"listing": 1, "amount": "12.50"}, ...]}``. Each bid is
+  placed in its own transaction and gets its own result.
+"""
+
+import json
+from functools import wraps
+
+from django.db.models import F
+from django.http import JsonResponse
+
+from .bidding import AuctionClosed, BidTooLow, InvalidAmount, place_bid
+from .models import Listing, Bid, ArchivedBid, Comment
+from .pagination import paginate_values
+from .routers import use_primary
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SIZE = 100
+MAX_BULK_BIDS = 50
+
+# Public field name -> None for a model column, or the expression selecting it.
+LISTING_FIELDS = {
+    "id": None,
+    "title": None,
+    "description": None,
+    "starting_bid": None,
+    "current_price": None,
+    "active": None,
+    "image_url": None,
+    "owner_id": None,
+    "owner_username": F("owner__username"),
+    "category_id": None,
+    "category_name": F("category__name"),
+    "winner_id": None,
+    "bid_count": None,
+    "last_bid_at": None,
+    "ends_at": None,
+    "updated_at": None,
+    "version": None,
+}
+
+# Returned when ``fields`` is not given: every column except the long
+# description, and nothing that needs a join.
+DEFAULT_LISTING_FIELDS = [
+    name for name, expression in LISTING_FIELDS.items()
+    if expression is None and name != "description"
+]
+
+BID_FIELDS = {
+    "id": None, "amount": None, "bidder_id": None, "bidder_username": F("bidder__username"),
+    "timestamp": None,
+}
+
+COMMENT_FIELDS = {
+    "id": None, "content": None, "author_id": None, "author_username": F("author__username")
+}
+
+BID_ERRORS = {
+    InvalidAmount: "invalid_amount",
+    BidTooLow: "bid_too_low",
+    AuctionClosed: "auction_closed",
+    Listing.DoesNotExist: "not_found",
+}
+
+
+class ApiError(Exception):
+    """A request the API rejects with ``status`` and an error message."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def error_response(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def api_view(methods=("GET",)):
+    """Require a session and one of ``methods``; turn ApiError into JSON."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error_response(f"Method {request.method} not allowed.", 405)
+                response["Allow"] = ", ".join(methods)
+                return response
+            if not request.user.is_authenticated:
+                return error_response("Authentication required.", 401)
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                return error_response(str(exc), exc.status)
+        return wrapper
+    return decorator
+
+
+def select(queryset, names, fields):
+    """Return ``queryset.values()`` of the public field ``names``."""
+    columns = [name for name in names if fields[name] is None]
+    expressions = {name: fields[name] for name in names if fields[name] is not None}
+    return queryset.values(*columns, **expressions)
+
+
+def requested_fields(request, fields=LISTING_FIELDS, default=DEFAULT_LISTING_FIELDS):
+    """Return the field names asked for in ``?fields=``, always with ``id``."""
+    raw = request.GET.get("fields")
+    if not raw:
+        return list(default)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}.")
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+def _int_list(raw, name):
+    try:
+        return [int(value) for value in raw.split(",") if value.strip()]
+    except ValueError:
+        raise ApiError(f"{name} must be a comma separated list of integers.")
+
+
+def _page_size(request):
+    raw = request.GET.get("limit")
+    if not raw:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError("limit must be an integer.")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _page(request, queryset):
+    return paginate_values(queryset, request.GET.get("cursor"), _page_size(request))
+
+
+def _page_response(page):
+    return JsonResponse({
+        "results": page.object_list,
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+
+
+@api_view()
+def listings(request):
+    """Return a page of listings, newest first."""
+    queryset = Listing.objects.all()
+    active = request.GET.get("active", "true").lower()
+    if active in ("true", "1"):
+        queryset = queryset.filter(active=True)
+    elif active in ("false", "0"):
+        queryset = queryset.filter(active=False)
+    elif active != "all":
+        raise ApiError("active must be true, false or all.")
+    category = request.GET.get("category")
+    if category:
+        if not category.isdigit():
+            raise ApiError("category must be an integer.")
+        queryset = queryset.filter(category_id=int(category))
+    queryset = select(queryset, requested_fields(request), LISTING_FIELDS)
+    return _page_response(_page(request, queryset))
+
+
+@api_view()
+def listing_batch(request):
+    """Return the listings whose ids are given in ``?ids=``, in that order."""
+    ids = list(dict.fromkeys(_int_list(request.GET.get("ids", ""), "ids")))
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ApiError(f"At most {MAX_BATCH_SIZE} ids can be fetched at once.")
+    rows = select(
+        Listing.objects.filter(id__in=ids), requested_fields(request), LISTING_FIELDS
+    ) if ids else []
+    by_id = {row["id"]: row for row in rows}
+    return JsonResponse({
+        "results": [by_id[listing_id] for listing_id in ids if listing_id in by_id],
+        "missing": [listing_id for listing_id in ids if listing_id not in by_id],
+    })
+
+
+@api_view()
+def listing_detail(request, listing_id):
+    """Return one listing."""
+    row = select(
+        Listing.objects.filter(id=listing_id), requested_fields(request), LISTING_FIELDS
+    ).first()
+    if row is None:
+        raise ApiError("No such listing.", 404)
+    return JsonResponse(row)
+
+
+def _history(request, listing_id, queryset):
+    page = _page(request, queryset)
+    # Only an empty first page needs to tell an unknown listing apart
+    # from one without rows.
+    if (
+        not page.object_list
+        and not request.GET.get("cursor")
+        and not Listing.objects.filter(id=listing_id).exists()
+    ):
+        raise ApiError("No such listing.", 404)
+    return _page_response(page)
+
+
+@api_view()
+def listing_bids(request, listing_id):
+    """Return the bid history of a listing, newest first."""
+    bids = select(Bid.objects.filter(listing_id=listing_id), BID_FIELDS, BID_FIELDS)
+    page = _page(request, bids)
+    if not page.object_list:
+        archived = Listing.objects.filter(id=listing_id).values_list(
+            "bids_archived", flat=True
+        ).first()
+        if archived is None:
+            raise ApiError("No such listing.", 404)
+        if archived:
+            page = _page(request, select(
+                ArchivedBid.objects.filter(listing_id=listing_id), BID_FIELDS, BID_FIELDS
+            ))
+    return _page_response(page)
+
+
+@api_view()
+def listing_comments(request, listing_id):
+    """Return the comments of a listing, newest first."""
+    comments = select(
+        Comment.objects.filter(listing_id=listing_id), COMMENT_FIELDS, COMMENT_FIELDS
+    )
+    return _history(request, listing_id, comments)
+
+
+def _bulk_bid_items(request):
+    try:
+        body = json.loads(request.body)
+    except (UnicodeDecodeError, ValueError):
+        raise ApiError("The request body must be JSON.")
+    items = body.get("bids") if isinstance(body, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ApiError('The body must be {"bids": [{"listing": id, "amount": "0.00"}, ...]}.')
+    if len(items) > MAX_BULK_BIDS:
+        raise ApiError(f"At most {MAX_BULK_BIDS} bids can be placed at once.")
+    return items
+
+
+@api_view(methods=("POST",))
+@use_primary
+def bulk_bids(request):
+    """Place every bid of the JSON body and report each one's outcome."""
+    results = []
+    for item in _bulk_bid_items(request):
+        listing_id = item.get("listing")
+        result = {"listing": listing_id}
+        try:
+            if not isinstance(listing_id, int):
+                raise Listing.DoesNotExist(f"No such listing: {listing_id!r}.")
+            bid = place_bid(listing_id, request.user, item.get("amount"))
+        except tuple(BID_ERRORS) as exc:
+            result.update(status="rejected", error=BID_ERRORS[type(exc)], detail=str(exc))
+        else:
+            result.update(status="accepted", bid=bid.id, amount=bid.amount)
+        results.append(result)
+    return JsonResponse({
+        "results": results,
+        "accepted": sum(result["status"] == "accepted" for result in results),
+    })
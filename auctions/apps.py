@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+
+        from . import signals
+
+        post_migrate.connect(signals.ensure_search_index, sender=self)
+        connection_created.connect(signals.apply_sqlite_pragmas)
+        connection_created.connect(signals.instrument_queries)
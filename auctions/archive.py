@@ -0,0 +1,150 @@
+"""
+Bid archival and streaming bid exports.
+
+Bids of listings that closed (``Listing.closed_at``) more than
+``settings.BID_ARCHIVE_AFTER_DAYS`` days ago are moved from the hot Bid
+table, which bidding and closing query, into ArchivedBid, keeping their
+ids and timestamps. Every transaction moves at most ``batch_size`` bids,
+however many bids a listing has: copy them, then delete them by id
+without loading them (the Bid delete signals only bump card versions,
+which is done once per listing instead). A group of listings has its
+``leading_bid`` cleared first and is marked ``bids_archived`` once all
+its bids moved; an interrupted run resumes where it stopped. The listing
+keeps its price, winner and ``bid_count``. rebuild_bid_stats skips
+archived listings.
+
+Exports stream bids (live, archived or both) as CSV or JSON lines. Rows
+are read in keyset batches of ``chunk_size``, so memory use and the
+length of every read transaction stay constant whatever the row count.
+
+Functions:
+- archive_cutoff: Return the closing time before which bids are archived.
+- archive_bids: Move the bids of long-closed listings to ArchivedBid.
+- bid_rows: Yield bid rows as dicts, batch by batch.
+- csv_lines: Format bid rows as CSV lines.
+- jsonl_lines: Format bid rows as JSON lines.
+"""
+
+import csv
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .cards import bump_card_versions
+from .models import Listing, Bid, ArchivedBid
+
+BID_FIELDS = ("id", "listing_id", "bidder_id", "amount", "timestamp")
+EXPORT_FIELDS = BID_FIELDS + ("archived",)
+
+# Archived rows inserted per INSERT statement.
+INSERT_BATCH_SIZE = 500
+
+# Closed listings whose bids are moved together.
+LISTING_BATCH_SIZE = 100
+
+
+def archive_cutoff(days=None, now=None):
+    """Return the time before which closed listings have their bids archived."""
+    if days is None:
+        days = getattr(settings, "BID_ARCHIVE_AFTER_DAYS", 30)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archive_bids(closed_before, batch_size=1000, pause=0):
+    """
+    Archive the bids of listings closed before ``closed_before``.
+
+    At most ``batch_size`` bids are moved per transaction and ``pause``
+    seconds are slept between transactions. Returns ``(listings, bids)``
+    archived.
+    """
+    pending = Listing.objects.filter(
+        active=False, bids_archived=False, closed_at__lt=closed_before
+    ).order_by("closed_at")
+    listings = bids = 0
+    while True:
+        ids = list(pending.values_list("id", flat=True)[:LISTING_BATCH_SIZE])
+        if not ids:
+            return listings, bids
+        Listing.objects.filter(id__in=ids).update(leading_bid=None)
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    Bid.objects.filter(listing_id__in=ids)
+                    .order_by("id").values(*BID_FIELDS)[:batch_size]
+                )
+                if rows:
+                    ArchivedBid.objects.bulk_create(
+                        [ArchivedBid(**row) for row in rows], batch_size=INSERT_BATCH_SIZE
+                    )
+                    Bid.objects.filter(id__in=[row["id"] for row in rows])._raw_delete(
+                        Bid.objects.db
+                    )
+            bids += len(rows)
+            if pause and rows:
+                time.sleep(pause)
+            if len(rows) < batch_size:
+                break
+        Listing.objects.filter(id__in=ids).update(bids_archived=True)
+        bump_card_versions(ids)
+        listings += len(ids)
+
+
+def _batches(queryset, archived, chunk_size):
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by("id").values(*BID_FIELDS)[:chunk_size]
+        )
+        for row in rows:
+            row["archived"] = archived
+            yield row
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def bid_rows(listing_id=None, since=None, until=None, source="all", chunk_size=2000):
+    """
+    Yield bids as dicts of EXPORT_FIELDS, live bids first, in id order.
+
+    ``source`` is "live", "archive" or "all"; ``since`` and ``until``
+    bound the bid timestamps (inclusive and exclusive).
+    """
+    sources = {"live": [(Bid, False)], "archive": [(ArchivedBid, True)]}
+    sources["all"] = sources["live"] + sources["archive"]
+    for model, archived in sources[source]:
+        queryset = model.objects.all()
+        if listing_id is not None:
+            queryset = queryset.filter(listing_id=listing_id)
+        if since is not None:
+            queryset = queryset.filter(timestamp__gte=since)
+        if until is not None:
+            queryset = queryset.filter(timestamp__lt=until)
+        yield from _batches(queryset, archived, chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() returns what it was given."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """Yield a CSV header and one CSV line per row."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def jsonl_lines(rows):
+    """Yield one JSON document per row, newline terminated."""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
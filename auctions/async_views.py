@@ -0,0 +1,164 @@
+"""
+Async versions of the read-heavy pages.
+
+Each view reads with Django's async ORM and awaits its reads one after
+another. The async ORM and sync_to_async run all of a request's queries
+on that request's one thread-sensitive executor thread, on its one
+connection, so gathering them would not make them overlap: what the event
+loop gains is serving other requests while this one waits on the
+database. Helpers that mix the cache and the ORM, the ETag functions and
+template rendering (context processors may query) run through
+sync_to_async.
+
+They answer the same URLs, templates and ETags as their counterparts in
+auctions.views, and are mounted instead of them when
+``settings.ASYNC_VIEWS`` is set; serve the project through
+``commerce/asgi.py`` then, since under WSGI every async view pays for an
+event loop of its own.
+"""
+
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.views.decorators.cache import cache_control
+
+from .categories import catalog_entry
+from .conditional import async_condition, index_etag, listing_etag
+from .models import Listing, Comment, Notification
+from .pagination import apaginate
+from .views import (
+    CommentForm, LISTINGS_PER_PAGE, NOTIFICATIONS_PER_PAGE, categories_with_counts
+)
+from .watchlist import is_watching, watched_ids
+
+
+async def _user(request):
+    user = await request.auser()
+    # Spares the templates' context processors a second session lookup.
+    request.user = user
+    return user
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _render(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@cache_control(private=True, no_cache=True)
+@async_condition(partial(index_etag, per_page=LISTINGS_PER_PAGE))
+async def index(request):
+    """Render the index page with active listings."""
+    user = await _user(request)
+    page_obj = await apaginate(
+        Listing.objects.filter(active=True), request.GET.get('cursor'), LISTINGS_PER_PAGE
+    )
+    if user.is_authenticated:
+        watched = await sync_to_async(watched_ids)(user.id)
+    else:
+        watched = frozenset()
+    return await _render(request, "auctions/index.html", {
+        "page_obj": page_obj,
+        "watched_ids": watched
+    })
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@async_condition(listing_etag)
+async def view_listing(request, listing_id, override=None):
+    """View a specific listing."""
+    user = await _user(request)
+    listing_id = int(listing_id)
+    try:
+        listing = await Listing.objects.select_related('category').aget(id=listing_id)
+    except Listing.DoesNotExist:
+        raise Http404("No Listing matches the given query.")
+
+    if not listing.active and not override:
+        return redirect('index')
+
+    comments = await _list(
+        Comment.objects.filter(listing_id=listing_id).select_related('author')
+    )
+    watching = await sync_to_async(is_watching)(user.id, listing_id)
+
+    return await _render(request, "auctions/view_listing.html", {
+        "listing": listing,
+        "isowner": listing.owner_id == user.id,
+        "comments": comments,
+        "comment_form": CommentForm(),
+        "min_bid": listing.current_price + 1,
+        "override": override is not None,
+        "watching": watching
+    })
+
+
+@login_required
+async def notifications_show(request):
+    """Show notifications for the logged-in user, newest first."""
+    user = await _user(request)
+    page_obj = await apaginate(
+        Notification.objects.filter(user=user).select_related('listing'),
+        request.GET.get('cursor'),
+        NOTIFICATIONS_PER_PAGE
+    )
+    return await _render(request, 'auctions/notifications.html', {
+        'notifications': page_obj,
+        'page_obj': page_obj
+    })
+
+
+@login_required
+async def display_watchlist(request):
+    """Display the watchlist for the logged-in user."""
+    user = await _user(request)
+    page_obj = await apaginate(
+        Listing.objects.filter(watchers=user, active=True),
+        request.GET.get('cursor'),
+        LISTINGS_PER_PAGE
+    )
+    return await _render(request, 'auctions/watchlist.html', {
+        "listings": page_obj,
+        "page_obj": page_obj
+    })
+
+
+@login_required
+async def display_category(request):
+    """Display the categories, or redirect to the one that was picked."""
+    await _user(request)
+    category_id = request.POST.get('category') or request.GET.get('category')
+    if category_id and category_id.isdigit():
+        return redirect('category_listings', category_id=int(category_id))
+
+    return await _render(request, 'auctions/categories.html', {
+        'categories': await sync_to_async(categories_with_counts)(),
+        'find_listing': False
+    })
+
+
+@login_required
+async def category_listings(request, category_id):
+    """Display the active listings of a category, one page at a time."""
+    await _user(request)
+    category = await sync_to_async(catalog_entry)(category_id)
+    if category is None:
+        raise Http404("No such category.")
+    page_obj = await apaginate(
+        Listing.objects.filter(category_id=category.id, active=True),
+        request.GET.get('cursor'),
+        LISTINGS_PER_PAGE
+    )
+    return await _render(request, 'auctions/categories.html', {
+        'listings': page_obj,
+        'page_obj': page_obj,
+        'category': category,
+        'categories': await sync_to_async(categories_with_counts)(),
+        'find_listing': True
+    })
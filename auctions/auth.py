@@ -0,0 +1,85 @@
+"""
+Authentication hot path.
+
+AuthenticationMiddleware loads the logged-in user on every request that
+touches ``request.user``. CachedUserBackend serves that load from the
+cache named by ``settings.USER_CACHE`` (for ``USER_CACHE_TIMEOUT``
+seconds) instead of querying ``auctions_user``. Saving or deleting a user
+drops the cached copy (see auctions.signals), so password changes still
+end other sessions and deactivated users are logged out. Bulk
+``update()`` calls bypass the signals; the timeout bounds how long their
+changes go unseen.
+
+PBKDF2PasswordHasher is Django's PBKDF2-SHA256 hasher with its iteration
+count taken from ``settings.PASSWORD_HASH_ITERATIONS`` (Django's default
+when unset). It keeps Django's ``pbkdf2_sha256`` algorithm name, so
+existing hashes verify, and a hash made with another count is re-hashed
+with the configured one at the user's next login. ``bench_auth`` measures
+the hash time per iteration count to size the setting.
+
+Classes:
+- CachedUserBackend: ModelBackend that caches the users it loads.
+- PBKDF2PasswordHasher: PBKDF2-SHA256 with a configurable iteration count.
+
+Functions:
+- forget_users: Drop the cached copies of some users.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+# Seconds a cached user is kept; bounds the damage of a missed invalidation.
+USER_TIMEOUT = 300
+
+
+def user_cache():
+    """Return the cache that stores users."""
+    return caches[getattr(settings, "USER_CACHE", "default")]
+
+
+def user_timeout():
+    return getattr(settings, "USER_CACHE_TIMEOUT", USER_TIMEOUT)
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+def forget_users(user_ids):
+    """Drop the cached copies of ``user_ids``."""
+    user_cache().delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+class CachedUserBackend(ModelBackend):
+    """ModelBackend whose get_user() is served from the user cache."""
+
+    def get_user(self, user_id):
+        cache = user_cache()
+        user = cache.get(_user_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(_user_key(user_id), user, timeout=user_timeout())
+        return user
+
+    async def aget_user(self, user_id):
+        cache = user_cache()
+        user = await cache.aget(_user_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await cache.aset(_user_key(user_id), user, timeout=user_timeout())
+        return user
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with ``settings.PASSWORD_HASH_ITERATIONS`` iterations."""
+
+    @property
+    def iterations(self):
+        return (
+            getattr(settings, "PASSWORD_HASH_ITERATIONS", None)
+            or hashers.PBKDF2PasswordHasher.iterations
+        )
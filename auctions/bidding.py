@@ -0,0 +1,315 @@
+"""
+Bid placement service for the auctions app.
+
+A bid is accepted with a single conditional UPDATE on the listing row
+(``current_price < amount``) followed by the Bid insert, both inside one
+transaction. Two concurrent bidders can therefore never both win the
+comparison against a stale price, and ``Listing.current_price`` always
+matches the highest accepted Bid. The listing's bid statistics
+(``bid_count``, ``leading_bid``, ``last_bid_at``) are maintained in the
+same transaction. Watchers of the listing are notified by a background
+job queued in that transaction, so bidding costs the same however many
+users watch the listing.
+
+Proxy (automatic) bidding: a user stores a maximum in a ProxyBid and the
+engine bids for them. After every bid or new maximum, the two highest
+maxima of the listing are read and the bid war they would fight is
+settled at once: at most two Bid rows (the runner-up's maximum and the
+winner's price one BID_INCREMENT above it) instead of one per increment.
+
+Classes:
+- TopTwo: The two best proxy maxima of a listing.
+
+Functions:
+- parse_amount: Convert user input into a two-decimal Decimal.
+- place_bid: Atomically place a bid on a listing.
+- place_proxy_bid: Set a user's maximum on a listing and settle the proxies.
+- proxy_outcome: Compute the bids that settle a listing's proxies.
+- resolve_proxies: Place the bids the proxies of a listing call for.
+- rebuild_bid_stats: Recompute listing bid statistics from the Bid table.
+"""
+
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cards import bump_card_versions
+from .events import listing_channel, publish
+from .models import Listing, Bid, Notification, ProxyBid
+from .notifications import notify_watchers
+
+CENT = Decimal("0.01")
+
+# Amounts must fit the price columns (max_digits=10, decimal_places=2).
+MAX_AMOUNT = Decimal("99999999.99")
+
+# Step by which a proxy bid outbids its rival.
+BID_INCREMENT = Decimal("1.00")
+
+
+class BidError(Exception):
+    """Base class for rejected bids."""
+
+
+class InvalidAmount(BidError):
+    """The submitted amount is not a positive decimal number below 10^8."""
+
+
+class BidTooLow(BidError):
+    """The amount does not exceed the listing's current price."""
+
+
+class AuctionClosed(BidError):
+    """The listing is no longer accepting bids."""
+
+
+def parse_amount(value):
+    """Return ``value`` as a positive Decimal rounded to cents, up to MAX_AMOUNT."""
+    try:
+        amount = Decimal(str(value).strip()).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError, ValueError):
+        raise InvalidAmount(f"Invalid bid amount: {value!r}")
+    if not amount.is_finite() or amount <= 0 or amount > MAX_AMOUNT:
+        raise InvalidAmount(f"Invalid bid amount: {value!r}")
+    return amount
+
+
+def _accept_bid(listing_id, bidder_id, bidder_name, amount, now):
+    """Write one bid of ``amount``, or raise AuctionClosed/BidTooLow."""
+    updated = Listing.objects.filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+        id=listing_id,
+        active=True,
+        current_price__lt=amount,
+    ).touch(
+        current_price=amount,
+        bid_count=F("bid_count") + 1,
+        last_bid_at=now
+    )
+
+    if not updated:
+        listing = Listing.objects.only("active", "current_price", "ends_at").get(id=listing_id)
+        if not listing.active or (listing.ends_at and listing.ends_at <= now):
+            raise AuctionClosed(f"Listing {listing_id} is closed.")
+        raise BidTooLow(
+            f"Bid {amount} does not exceed current price {listing.current_price}."
+        )
+
+    listing = Listing.objects.only("title", "owner_id", "bid_count").get(id=listing_id)
+    bid = Bid.objects.create(
+        amount=amount, bidder_id=bidder_id, listing_id=listing_id, timestamp=now
+    )
+    Listing.objects.filter(id=listing_id).update(leading_bid=bid)
+    publish(listing_channel(listing_id), "bid", {
+        "listing": listing_id,
+        "price": amount,
+        "bid_count": listing.bid_count,
+        "bidder": bidder_name,
+    })
+    if listing.owner_id is not None:
+        Notification.objects.create(
+            user_id=listing.owner_id,
+            message=f"A new offer has been made in: {listing.title}",
+            kind=Notification.OFFER,
+            listing_id=listing_id
+        )
+    notify_watchers([(
+        listing_id,
+        f"A new offer has been made in: {listing.title}",
+        (listing.owner_id, bidder_id),
+    )], kind=Notification.OFFER)
+    return bid
+
+
+def place_bid(listing_id, bidder, amount):
+    """
+    Place a bid of ``amount`` by ``bidder`` on the listing ``listing_id``.
+
+    Proxy bids that exceed it answer in the same transaction. Returns the
+    created Bid. Raises Listing.DoesNotExist, AuctionClosed or BidTooLow
+    when the bid is rejected; nothing is written in that case.
+    """
+    amount = parse_amount(amount)
+    with transaction.atomic():
+        now = timezone.now()
+        bid = _accept_bid(listing_id, bidder.id, bidder.username, amount, now)
+        resolve_proxies(listing_id, now)
+    return bid
+
+
+ProxyEntry = namedtuple("ProxyEntry", ["max_amount", "placed_at", "id", "user_id", "username"])
+
+
+def _rank(entry):
+    # Highest maximum first; the earlier of two equal maxima wins.
+    return (-entry.max_amount, entry.placed_at, entry.id)
+
+
+class TopTwo:
+    """The two best proxy maxima of a listing, best first."""
+
+    def __init__(self, entries=()):
+        self.entries = []
+        for entry in entries:
+            self.push(entry)
+
+    def push(self, entry):
+        """Offer ``entry``; keep it if it ranks among the best two."""
+        entries = self.entries
+        if len(entries) == 2 and _rank(entry) >= _rank(entries[1]):
+            return
+        entries.append(entry)
+        entries.sort(key=_rank)
+        del entries[2:]
+
+    @property
+    def first(self):
+        return self.entries[0] if self.entries else None
+
+    @property
+    def second(self):
+        return self.entries[1] if len(self.entries) > 1 else None
+
+
+def proxy_outcome(top, current_price, leader_id, increment=BID_INCREMENT):
+    """
+    Return the ``(entry, amount)`` bids that settle the proxies in ``top``.
+
+    However long the bid war the proxies would fight one increment at a
+    time, its result depends only on the two highest maxima: the best one
+    leads at one increment above the runner-up's maximum (or above the
+    current price), capped at its own maximum. The runner-up's maximum is
+    recorded as a bid first when it beats the current price. At most two
+    bids are returned, in ascending amount.
+    """
+    first, second = top.first, top.second
+    if first is None:
+        return []
+    if first.user_id == leader_id:
+        # The leader only answers a rival maximum above the current price.
+        if second is None or second.max_amount <= current_price:
+            return []
+        rival = second.max_amount
+    else:
+        if first.max_amount <= current_price:
+            return []
+        rival = max(current_price, second.max_amount if second else current_price)
+    target = min(first.max_amount, rival + increment)
+    bids = []
+    if second is not None and current_price < second.max_amount < target:
+        bids.append((second, second.max_amount))
+    if first.user_id != leader_id or target > current_price:
+        bids.append((first, target))
+    return bids
+
+
+def resolve_proxies(listing_id, now=None):
+    """
+    Place the bids the listing's proxy maxima call for; return them.
+
+    Reads the two highest maxima through ``proxybid_ladder_idx`` and writes
+    at most two bids, so it costs the same whatever the number of proxies.
+    Call it inside the transaction that changed the price or the proxies.
+    """
+    rows = ProxyBid.objects.filter(listing_id=listing_id).order_by(
+        "-max_amount", "placed_at", "id"
+    ).values_list("max_amount", "placed_at", "id", "user_id", "user__username")[:2]
+    top = TopTwo(ProxyEntry(*row) for row in rows)
+    if top.first is None:
+        return []
+    state = Listing.objects.filter(id=listing_id).values(
+        "current_price", "leading_bid__bidder_id"
+    ).get()
+    now = now or timezone.now()
+    return [
+        _accept_bid(listing_id, entry.user_id, entry.username, amount, now)
+        for entry, amount in proxy_outcome(
+            top, state["current_price"], state["leading_bid__bidder_id"]
+        )
+    ]
+
+
+def place_proxy_bid(listing_id, bidder, max_amount):
+    """
+    Let ``bidder`` bid automatically on ``listing_id`` up to ``max_amount``.
+
+    Replaces the bidder's previous maximum, which may only be raised, then
+    settles every proxy of the listing. Returns the bids placed. Raises
+    Listing.DoesNotExist, AuctionClosed or BidTooLow like place_bid.
+    """
+    max_amount = parse_amount(max_amount)
+    with transaction.atomic():
+        now = timezone.now()
+        listing = Listing.objects.select_for_update().only(
+            "active", "current_price", "ends_at"
+        ).get(id=listing_id)
+        if not listing.active or (listing.ends_at and listing.ends_at <= now):
+            raise AuctionClosed(f"Listing {listing_id} is closed.")
+        if max_amount <= listing.current_price:
+            raise BidTooLow(
+                f"Maximum {max_amount} does not exceed current price {listing.current_price}."
+            )
+        previous = ProxyBid.objects.filter(
+            listing_id=listing_id, user_id=bidder.id
+        ).values_list("max_amount", flat=True).first()
+        if previous is not None and max_amount <= previous:
+            raise BidTooLow(f"Maximum {max_amount} does not exceed your maximum {previous}.")
+        ProxyBid.objects.update_or_create(
+            listing_id=listing_id, user_id=bidder.id,
+            defaults={"max_amount": max_amount, "placed_at": now},
+        )
+        return resolve_proxies(listing_id, now)
+
+
+def rebuild_bid_stats(queryset=None, batch_size=1000, dry_run=False):
+    """
+    Recompute ``bid_count``, ``leading_bid`` and ``last_bid_at`` from the
+    Bid table.
+
+    Listings are walked in primary key batches; only rows whose stored
+    statistics differ are written, with one bulk_update per batch. Returns
+    the number of listings that were out of date. Listings whose bids were
+    archived are skipped.
+    """
+    if queryset is None:
+        queryset = Listing.objects.all()
+    queryset = queryset.filter(bids_archived=False)
+    bids = Bid.objects.filter(listing=OuterRef("pk"))
+    queryset = queryset.annotate(
+        actual_count=Coalesce(
+            Subquery(
+                bids.order_by().values("listing").annotate(n=Count("*")).values("n")
+            ),
+            Value(0),
+        ),
+        actual_leader=Subquery(bids.order_by("-amount", "id").values("id")[:1]),
+        actual_last=Subquery(
+            bids.order_by().values("listing").annotate(last=Max("timestamp")).values("last")
+        ),
+    ).only("id", "bid_count", "leading_bid", "last_bid_at").order_by("pk")
+
+    stale = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return stale
+        last_pk = batch[-1].pk
+        changed = []
+        for listing in batch:
+            if (listing.bid_count, listing.leading_bid_id, listing.last_bid_at) == (
+                listing.actual_count, listing.actual_leader, listing.actual_last
+            ):
+                continue
+            listing.bid_count = listing.actual_count
+            listing.leading_bid_id = listing.actual_leader
+            listing.last_bid_at = listing.actual_last
+            changed.append(listing)
+        stale += len(changed)
+        if changed and not dry_run:
+            Listing.objects.bulk_update(changed, ["bid_count", "leading_bid", "last_bid_at"])
+            bump_card_versions([listing.pk for listing in changed])
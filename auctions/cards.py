@@ -0,0 +1,106 @@
+"""
+Cached rendering of listing cards.
+
+Each rendered card is stored under a key made of the listing id, the card
+variant, whether it is marked as watched and a per-listing version
+counter. Saving or deleting a Listing or a Bid bumps the counter (see
+auctions.signals), so stale fragments are never read again and simply
+expire from the cache.
+
+The cache alias is taken from ``settings.LISTING_CARD_CACHE``.
+
+Functions:
+- bump_card_versions: Invalidate the cached cards of some listings.
+- render_cards: Render the cards of many listings with two cache round trips.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = "auctions/listing_card.html"
+VARIANTS = ("index", "category", "watchlist")
+
+
+def card_cache():
+    """Return the cache that stores listing cards."""
+    return caches[getattr(settings, "LISTING_CARD_CACHE", "default")]
+
+
+def card_timeout():
+    """Return how long a rendered card may stay in the cache, in seconds."""
+    return getattr(settings, "LISTING_CARD_TIMEOUT", 300)
+
+
+def _version_key(listing_id):
+    return f"listing_card_version:{listing_id}"
+
+
+def _card_key(listing_id, version, variant, watched):
+    return f"listing_card:{listing_id}:{version}:{variant}{':watched' if watched else ''}"
+
+
+def _new_version():
+    # Seeding counters from the clock means a counter evicted from the cache
+    # never comes back with a value that matches an old fragment.
+    return time.time_ns()
+
+
+def card_versions(listing_ids):
+    """Return ``{listing_id: version}``, creating missing counters."""
+    cache = card_cache()
+    keys = {_version_key(listing_id): listing_id for listing_id in listing_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update({keys[key]: version for key, version in missing.items()})
+    return versions
+
+
+def bump_card_versions(listing_ids):
+    """Invalidate every cached card of the given listings."""
+    cache = card_cache()
+    for listing_id in listing_ids:
+        try:
+            cache.incr(_version_key(listing_id))
+        except ValueError:
+            cache.set(_version_key(listing_id), _new_version(), timeout=None)
+
+
+def render_cards(listings, variant, watched=frozenset()):
+    """
+    Return the concatenated HTML of the cards of ``listings``.
+
+    Cards of listings whose id is in ``watched`` are marked as watched.
+    """
+    listings = list(listings)
+    if not listings:
+        return ""
+    cache = card_cache()
+    versions = card_versions([listing.id for listing in listings])
+    keys = [
+        _card_key(listing.id, versions[listing.id], variant, listing.id in watched)
+        for listing in listings
+    ]
+    cached = cache.get_many(keys)
+
+    fragments = []
+    rendered = {}
+    for key, listing in zip(keys, listings):
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {
+                "listing": listing,
+                "variant": variant,
+                "watched": listing.id in watched,
+            })
+            rendered[key] = html
+        fragments.append(html)
+    if rendered:
+        cache.set_many(rendered, timeout=card_timeout())
+    return mark_safe("".join(fragments))
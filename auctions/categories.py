@@ -0,0 +1,157 @@
+"""
+Cached category catalog and per-category counts of active listings.
+
+The catalog (every category's id and name) is cached twice: in the
+cache shared between processes under a version number, and in process
+memory. Each lookup reads only the version from the shared cache; the
+in-process copy is used while it matches and the database is queried
+only after a Category was saved or deleted, which bumps the version (see
+auctions.signals).
+
+Every category's number of active listings is kept in the cache and
+adjusted when a listing is created, closed or deleted, so the category
+sidebar never counts the listings table. Counters missing from the cache
+are filled with one grouped query over the ``listing_active_category_idx``
+index; writers that bypass model signals (bulk_create, update()) call
+``forget_counts`` afterwards. Counts are adjusted by the batch auction
+closer in its own process too, so they expire after COUNT_TIMEOUT
+seconds, bounding how long a process can show a count it missed.
+
+Both live in the cache aliased by ``settings.CATEGORY_CACHE``, which must
+be shared between processes: a Category changed through the admin of one
+worker has to reach the others.
+
+Functions:
+- catalog: Return every category as a CatalogEntry, ordered by name.
+- catalog_entry: Return one CatalogEntry, or None.
+- invalidate_catalog: Make every process reload the catalog.
+- active_counts: Return ``{category_id: active listings}``.
+- adjust_counts: Apply count changes once the current transaction commits.
+- forget_counts: Drop cached counts so they are recomputed.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Category, Listing
+
+CATALOG_VERSION_KEY = "category_catalog_version"
+
+# Seconds a catalog is kept under its version; old versions expire.
+CATALOG_TIMEOUT = 3600
+
+# Seconds a category's active listing count is kept before it is recounted.
+COUNT_TIMEOUT = 300
+
+CatalogEntry = namedtuple("CatalogEntry", ["id", "name"])
+
+_local = threading.local()
+
+
+def category_cache():
+    """Return the cache that stores the catalog and the category counts."""
+    return caches[getattr(settings, "CATEGORY_CACHE", "default")]
+
+
+def _catalog_key(version):
+    return f"category_catalog:{version}"
+
+
+def catalog():
+    """Return every category as a CatalogEntry, ordered by name."""
+    cache = category_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Clock-seeded, like the card versions: an evicted counter never
+        # comes back with the value of an older catalog.
+        version = time.time_ns()
+        if not cache.add(CATALOG_VERSION_KEY, version, timeout=None):
+            version = cache.get(CATALOG_VERSION_KEY, version)
+    if getattr(_local, "version", None) == version:
+        return _local.entries
+
+    entries = cache.get(_catalog_key(version))
+    if entries is None:
+        entries = [
+            CatalogEntry(*row)
+            for row in Category.objects.order_by("name").values_list("id", "name")
+        ]
+        cache.set(_catalog_key(version), entries, timeout=CATALOG_TIMEOUT)
+    _local.version, _local.entries = version, entries
+    return entries
+
+
+def catalog_entry(category_id):
+    """Return the CatalogEntry of ``category_id``, or None if there is none."""
+    for entry in catalog():
+        if entry.id == category_id:
+            return entry
+    return None
+
+
+def invalidate_catalog():
+    """Make every process reload the catalog on its next lookup."""
+    cache = category_cache()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _count_key(category_id):
+    return f"category_active_count:{category_id}"
+
+
+def active_counts(category_ids):
+    """Return ``{category_id: number of active listings}``."""
+    cache = category_cache()
+    keys = {_count_key(category_id): category_id for category_id in category_ids}
+    found = cache.get_many(keys)
+    counts = {keys[key]: count for key, count in found.items()}
+    missing = [category_id for key, category_id in keys.items() if key not in found]
+    if missing:
+        computed = dict.fromkeys(missing, 0)
+        computed.update(
+            Listing.objects.filter(active=True, category_id__in=missing)
+            .values_list("category_id")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        cache.set_many(
+            {_count_key(category_id): n for category_id, n in computed.items()},
+            timeout=COUNT_TIMEOUT
+        )
+        counts.update(computed)
+    return counts
+
+
+def _adjust(deltas):
+    cache = category_cache()
+    for category_id, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            if cache.incr(_count_key(category_id), delta) < 0:
+                cache.delete(_count_key(category_id))
+        except ValueError:
+            # Not cached: the next active_counts() recounts it.
+            pass
+
+
+def adjust_counts(deltas, using=None):
+    """Add ``{category_id: delta}`` to the cached counts on commit."""
+    deltas = dict(deltas)
+    transaction.on_commit(lambda: _adjust(deltas), using=using)
+
+
+def forget_counts(category_ids=None):
+    """Drop the cached counts of ``category_ids`` (default: every category)."""
+    if category_ids is None:
+        category_ids = [entry.id for entry in catalog()]
+    category_cache().delete_many([_count_key(category_id) for category_id in category_ids])
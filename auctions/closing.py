@@ -0,0 +1,144 @@
+"""
+Closing auctions, one at a time or in bulk.
+
+A batch of auctions is closed with a constant number of queries no matter
+its size: one query reads the listings together with the bidder of their
+leading bid, one UPDATE deactivates them and sets their winners, and one
+bulk_create writes the winner and owner notifications. The UPDATE only
+matches listings that are still active, so when two closers race for a
+listing (the owner and the batch closer, on a backend that lets both
+read it), only the one whose UPDATE changed it notifies and recounts.
+Watchers are told by background jobs, queued with one more INSERT.
+
+Functions:
+- close_listings: Close the active listings of a queryset in one batch.
+- close_listing: Close a single auction.
+- close_expired_listings: Close every auction whose deadline has passed.
+- run_closer: Call close_expired_listings periodically until stopped.
+"""
+
+import logging
+import threading
+from collections import Counter
+
+from django.db import OperationalError, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .cards import bump_card_versions
+from .categories import adjust_counts
+from .events import listing_channel, publish
+from .models import Listing, Bid, Notification
+from .notifications import create_notifications, notify_watchers
+
+logger = logging.getLogger(__name__)
+
+
+def close_listings(queryset, limit=None, notify_owner=True):
+    """
+    Close up to ``limit`` active listings of ``queryset``.
+
+    Winners are always notified; owners only if ``notify_owner`` is set.
+    Returns the number of listings closed by this call.
+    """
+    with transaction.atomic():
+        rows = queryset.filter(active=True).order_by("pk").values(
+            "id", "title", "owner_id", "category_id", "leading_bid__bidder_id"
+        )
+        rows = list(rows[:limit] if limit else rows)
+        if not rows:
+            return 0
+        ids = [row["id"] for row in rows]
+        closed_at = timezone.now()
+        updated = Listing.objects.filter(id__in=ids, active=True).touch(
+            active=False,
+            closed_at=closed_at,
+            winner_id=Subquery(
+                Bid.objects.filter(id=OuterRef("leading_bid_id")).values("bidder_id")[:1]
+            ),
+        )
+        if updated < len(ids):
+            # Another closer got some of them first: keep the rows this
+            # UPDATE changed, recognizable by their closing time.
+            ids = set(Listing.objects.filter(
+                id__in=ids, closed_at=closed_at
+            ).values_list("id", flat=True))
+            rows = [row for row in rows if row["id"] in ids]
+            ids = [row["id"] for row in rows]
+            if not rows:
+                return 0
+
+        notifications = []
+        for row in rows:
+            winner_id = row["leading_bid__bidder_id"]
+            if winner_id is not None:
+                notifications.append(Notification(
+                    user_id=winner_id,
+                    message=f"Congratulations, you have won the auction for: {row['title']}",
+                    listing_id=row["id"],
+                ))
+            if notify_owner and row["owner_id"] is not None:
+                notifications.append(Notification(
+                    user_id=row["owner_id"],
+                    message=f"Your auction has closed: {row['title']}",
+                    listing_id=row["id"],
+                ))
+        create_notifications(notifications)
+        closed_per_category = Counter(row["category_id"] for row in rows)
+        adjust_counts({category_id: -n for category_id, n in closed_per_category.items()})
+        notify_watchers(
+            (
+                row["id"],
+                f"An auction you are watching has closed: {row['title']}",
+                (row["owner_id"], row["leading_bid__bidder_id"]),
+            )
+            for row in rows
+        )
+
+        for row in rows:
+            publish(listing_channel(row["id"]), "closed", {
+                "listing": row["id"],
+                "winner": row["leading_bid__bidder_id"],
+            })
+    bump_card_versions(ids)
+    return len(rows)
+
+
+def close_listing(listing_id):
+    """Close one auction now; return False if it was already closed."""
+    return close_listings(Listing.objects.filter(id=listing_id), notify_owner=False) == 1
+
+
+def close_expired_listings(now=None, batch_size=1000):
+    """
+    Close every active listing whose ``ends_at`` is not after ``now``.
+
+    Works in transactions of ``batch_size`` listings so write locks stay
+    short. Returns the number of listings closed.
+    """
+    now = now or timezone.now()
+    expired = Listing.objects.filter(ends_at__lte=now)
+    closed = 0
+    while True:
+        count = close_listings(expired, limit=batch_size)
+        closed += count
+        if count < batch_size:
+            return closed
+
+
+def run_closer(interval=30, batch_size=1000, stop=None):
+    """
+    Close expired auctions every ``interval`` seconds until ``stop`` is set.
+
+    Lock timeouts are logged and retried on the next tick.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            closed = close_expired_listings(batch_size=batch_size)
+        except OperationalError:
+            logger.exception("Closing expired auctions failed; retrying in %ss", interval)
+        else:
+            if closed:
+                logger.info("Closed %s expired auctions", closed)
+        stop.wait(interval)
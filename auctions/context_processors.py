@@ -0,0 +1,20 @@
+"""
+Template context processors for the auctions app.
+"""
+
+from django.conf import settings
+
+from .notifications import unread_count
+
+
+def notifications(request):
+    """Add the logged-in user's cached unread notification count."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {"unread_notification_count": unread_count(user.id)}
+
+
+def live_events(request):
+    """Tell templates whether the Server-Sent Event streams are served."""
+    return {"live_events": getattr(settings, "LIVE_EVENTS", False)}
@@ -0,0 +1,141 @@
+"""
+In-process publish/subscribe hub and Server-Sent Events streams.
+
+Views and services publish events to named channels (one per listing and
+one per user); every open SSE response subscribed to the channel receives
+them. Publishing is thread-safe and non-blocking, so synchronous views can
+publish while the streams run on the ASGI event loop. Events published
+inside a transaction are only delivered once it commits.
+
+The hub lives in process memory: run the app under a single ASGI worker
+process (for example ``uvicorn commerce.asgi:application``) for every
+subscriber to see every event.
+
+Classes:
+- Hub: Channel registry that fans events out to subscriber queues.
+
+Functions:
+- publish: Deliver an event after the current transaction commits.
+- event_stream: Build the streaming response for one channel.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
+
+# Seconds between keep-alive comments on an idle stream.
+KEEPALIVE_INTERVAL = 15
+
+# Events buffered per subscriber before the oldest ones are dropped.
+QUEUE_SIZE = 100
+
+
+def listing_channel(listing_id):
+    return f"listing:{listing_id}"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """A subscriber's queue, bound to the event loop that reads it."""
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, message):
+        """Queue ``message``, dropping the oldest one if the reader lags."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """Fan events out to the subscriptions of a channel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+
+    def subscribe(self, channel):
+        """Return a new Subscription; must be called on the reader's event loop."""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+    def publish(self, channel, event, data):
+        """Send ``event`` with JSON ``data`` to every subscriber of ``channel``."""
+        message = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down.
+                self.unsubscribe(subscription)
+
+
+hub = Hub()
+
+
+def format_event(event, data):
+    """Encode one Server-Sent Events message."""
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def publish(channel, event, data, using=None):
+    """Publish on the hub once the current transaction (if any) commits."""
+    transaction.on_commit(lambda: hub.publish(channel, event, data), using=using)
+
+
+async def _stream(channel):
+    subscription = hub.subscribe(channel)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                yield await subscription.get(timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+def event_stream(channel):
+    """Return a text/event-stream response that follows ``channel``."""
+    response = StreamingHttpResponse(_stream(channel), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,162 @@
+"""
+Durable, database-backed background job queue.
+
+Requests enqueue a Job row inside their own transaction, so a job exists
+exactly when the change that caused it was committed. Workers (the
+run_jobs command) claim due jobs in batches with a conditional UPDATE that
+stamps them with a lease: ``run_at`` moves ``LEASE`` seconds ahead and
+``locked_by`` records the worker, so concurrent workers never run the same
+job and a job whose worker died becomes due again once the lease expires.
+
+A job that finishes is deleted. A job that raises is retried with
+exponential backoff and marked ``failed`` after ``MAX_ATTEMPTS``; failed
+jobs stay in the table for inspection.
+
+Handlers are registered per job kind with the ``handler`` decorator and
+receive the job's JSON payload. They may run more than once, so they must
+be idempotent. A kind registered with a ``collapse`` function runs only
+the newest of the claimed jobs that share a collapse key; the older ones
+are deleted unrun.
+
+Functions:
+- handler: Register the function that runs jobs of a kind.
+- enqueue: Add a job to the queue.
+- enqueue_many: Add many jobs of one kind with a single INSERT.
+- run_pending: Claim and run one batch of due jobs.
+- run_worker: Run jobs until stopped, sleeping while the queue is empty.
+"""
+
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed job is reserved for its worker.
+LEASE = 300
+
+# Attempts before a job is marked failed, and the delay before the first
+# retry in seconds (doubled on every further attempt).
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 10
+
+handlers = {}
+collapse_keys = {}
+
+
+def handler(kind, collapse=None):
+    """
+    Register the decorated function as the handler of ``kind`` jobs.
+
+    ``collapse`` maps a payload to a key; claimed jobs with equal keys are
+    run once, with the newest payload.
+    """
+    def register(function):
+        handlers[kind] = function
+        if collapse is not None:
+            collapse_keys[kind] = collapse
+        return function
+    return register
+
+
+def enqueue(kind, payload, delay=0):
+    """Add a ``kind`` job to the queue; it runs after ``delay`` seconds."""
+    return Job.objects.create(
+        kind=kind,
+        payload=payload,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_many(kind, payloads):
+    """Add one ``kind`` job per payload with a single bulk_create."""
+    now = timezone.now()
+    return Job.objects.bulk_create(
+        Job(kind=kind, payload=payload, run_at=now) for payload in payloads
+    )
+
+
+def claim(batch_size=100):
+    """Reserve up to ``batch_size`` due jobs for this worker and return them."""
+    now = timezone.now()
+    due = Job.objects.filter(failed=False, run_at__lte=now)
+    ids = list(due.order_by("run_at").values_list("id", flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    due.filter(id__in=ids).update(
+        run_at=now + timedelta(seconds=LEASE),
+        locked_by=token,
+        attempts=F("attempts") + 1,
+    )
+    return list(Job.objects.filter(id__in=ids, locked_by=token).order_by("run_at", "id"))
+
+
+def run_job(job):
+    """Run one claimed job; return True if it succeeded."""
+    try:
+        with transaction.atomic():
+            handlers[job.kind](job.payload)
+            job.delete()
+    except Exception as error:
+        logger.exception("Job %s failed (attempt %s)", job, job.attempts)
+        job.last_error = f"{type(error).__name__}: {error}"
+        job.locked_by = ""
+        if job.attempts >= MAX_ATTEMPTS:
+            job.failed = True
+        else:
+            job.run_at = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        job.save(update_fields=["last_error", "locked_by", "failed", "run_at"])
+        return False
+    return True
+
+
+def collapse(jobs):
+    """Split ``jobs`` into the ones to run and the superseded ones."""
+    newest = {}
+    for job in jobs:
+        key_function = collapse_keys.get(job.kind)
+        key = (job.kind, key_function(job.payload)) if key_function else job.id
+        if key not in newest or newest[key].id < job.id:
+            newest[key] = job
+    keep = {job.id for job in newest.values()}
+    return (
+        [job for job in jobs if job.id in keep],
+        [job for job in jobs if job.id not in keep],
+    )
+
+
+def run_pending(batch_size=100):
+    """Claim and run one batch of due jobs; return ``(succeeded, failed)``."""
+    jobs, superseded = collapse(claim(batch_size))
+    if superseded:
+        Job.objects.filter(id__in=[job.id for job in superseded]).delete()
+    results = [run_job(job) for job in jobs]
+    return results.count(True) + len(superseded), results.count(False)
+
+
+def run_worker(interval=1, batch_size=100, stop=None):
+    """
+    Run due jobs until ``stop`` is set.
+
+    Full batches are followed immediately by the next one; the worker only
+    sleeps ``interval`` seconds once the queue has nothing due.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            succeeded, failed = run_pending(batch_size)
+        except OperationalError:
+            logger.exception("Claiming jobs failed; retrying in %ss", interval)
+            succeeded = failed = 0
+        if succeeded + failed < batch_size:
+            stop.wait(interval)
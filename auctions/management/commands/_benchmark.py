@@ -0,0 +1,65 @@
+"""
+Shared helpers for the ``bench_*`` management commands.
+
+Benchmarks never touch the configured database: they build a throwaway
+SQLite file with the project's migrations applied, run against it and
+remove it afterwards. Every cache is swapped for one in process memory
+meanwhile, so ids from the scratch database never reach the site's
+shared caches.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+
+
+def _local_caches():
+    return {
+        name: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": f"bench-{name}",
+        }
+        for name in settings.CACHES
+    }
+
+
+@contextmanager
+def scratch_database(alias=DEFAULT_DB_ALIAS):
+    """Point ``alias`` at a freshly migrated temporary SQLite file."""
+    connection = connections[alias]
+    directory = tempfile.mkdtemp(prefix="auctions-bench-")
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    test_settings["NAME"] = os.path.join(directory, "bench.sqlite3")
+    with override_settings(CACHES=_local_caches()):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield connection
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings["NAME"] = old_test_name
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+@contextmanager
+def timer():
+    """Yield a dict whose ``seconds`` key is filled in on exit."""
+    result = {"seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def rate(count, seconds):
+    """Return ``count`` per second, guarding against a zero duration."""
+    return count / seconds if seconds > 0 else float("inf")
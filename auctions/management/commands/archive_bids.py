@@ -0,0 +1,35 @@
+"""
+Move the bids of long-closed listings to the archive table (see auctions.archive).
+
+Run it periodically, for example nightly from cron.
+"""
+
+from django.core.management.base import BaseCommand
+
+from auctions.archive import archive_bids, archive_cutoff
+
+from ._benchmark import rate, timer
+
+
+class Command(BaseCommand):
+    help = "Archive the bids of listings closed more than BID_ARCHIVE_AFTER_DAYS days ago."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int,
+                            help="Archive listings closed this many days ago "
+                                 "(default: settings.BID_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Bids moved per transaction.")
+        parser.add_argument("--pause", type=float, default=0,
+                            help="Seconds to sleep between transactions.")
+
+    def handle(self, *args, **options):
+        with timer() as elapsed:
+            listings, bids = archive_bids(
+                archive_cutoff(options["days"]), options["batch_size"], options["pause"]
+            )
+        seconds = elapsed["seconds"]
+        self.stdout.write(self.style.SUCCESS(
+            f"archived {bids} bids of {listings} listings in {seconds:.2f}s "
+            f"({rate(bids, seconds):.0f} bids/s)"
+        ))
@@ -0,0 +1,102 @@
+"""
+Measure listings serialized to JSON per second by the API.
+
+Compares serializing from model instances (select_related and one dict
+built per object, the usual hand-written serializer) with the API's
+``.values()`` path, then measures whole API pages through the test client.
+"""
+
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import Client
+from django.urls import reverse
+
+from auctions.api import LISTING_FIELDS, MAX_PAGE_SIZE, select
+from auctions.models import User, Category, Listing
+
+from ._benchmark import rate, scratch_database, timer
+
+
+def from_instances(queryset, names):
+    rows = []
+    for listing in queryset.select_related("owner", "category"):
+        row = {}
+        for name in names:
+            if name == "owner_username":
+                row[name] = listing.owner.username
+            elif name == "category_name":
+                row[name] = listing.category.name if listing.category else None
+            else:
+                row[name] = getattr(listing, name)
+        rows.append(row)
+    return rows
+
+
+def from_values(queryset, names):
+    return list(select(queryset, names, LISTING_FIELDS))
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON serialization of listings from model instances vs .values()."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=5_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--pages", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options["listings"])
+            self.run(options["listings"], options["repeat"], options["pages"])
+
+    def seed(self, total):
+        owner = User.objects.create(username="bench-owner")
+        category = Category.objects.create(name="Benchmark")
+        Listing.objects.bulk_create(
+            Listing(
+                title=f"Listing {i}",
+                description="Benchmark listing",
+                starting_bid=Decimal("1.00"),
+                current_price=Decimal("1.00"),
+                image_url="https://example.com/bench.jpg",
+                owner=owner,
+                category=category,
+            )
+            for i in range(total)
+        )
+        self.viewer = User.objects.create(username="bench-viewer")
+
+    def objects_per_second(self, serialize, names, total, repeat):
+        queryset = Listing.objects.order_by("-pk")
+        with timer() as elapsed:
+            for _ in range(repeat):
+                json.dumps(serialize(queryset, names), cls=DjangoJSONEncoder)
+        return rate(total * repeat, elapsed["seconds"])
+
+    def run(self, total, repeat, pages):
+        names = list(LISTING_FIELDS)
+        instances = self.objects_per_second(from_instances, names, total, repeat)
+        values = self.objects_per_second(from_values, names, total, repeat)
+        self.stdout.write(f"model instances: {instances:,.0f} objects/s")
+        self.stdout.write(f"values():        {values:,.0f} objects/s ({values / instances:.2f}x)")
+
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.viewer)
+        url = reverse("api_listings")
+        served = 0
+        cursor = None
+        with timer() as elapsed:
+            for _ in range(pages):
+                params = {"limit": MAX_PAGE_SIZE, "fields": ",".join(names)}
+                if cursor:
+                    params["cursor"] = cursor
+                page = client.get(url, params).json()
+                served += len(page["results"])
+                cursor = page["next"]
+        self.stdout.write(
+            f"API pages:       {rate(served, elapsed['seconds']):,.0f} objects/s "
+            f"({rate(pages, elapsed['seconds']):.1f} pages/s of {MAX_PAGE_SIZE})"
+        )
@@ -0,0 +1,152 @@
+"""
+Compare the sync pages under WSGI with the async pages under ASGI.
+
+Seeds listings, comments and watchers on a scratch database, then has
+``--concurrency`` users repeatedly load the index, category and listing
+pages: through the WSGI test client with auctions.views, served by a pool
+of ``--wsgi-threads`` worker threads, then through the ASGI test client
+with auctions.async_views, all users at once on one event loop. Both go
+through the full middleware stack. ``--db-latency`` adds a sleep to every
+query to stand in for a database reached over the network. Without it
+both servers are bound by the same CPU and ASGI pays for its thread
+hand-offs; as latency grows, WSGI is capped by its worker threads waiting
+on the database while ASGI keeps serving the other connections.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from types import ModuleType
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import URLPattern, reverse
+
+from auctions import async_views, urls, views
+from auctions.models import User, Category, Listing, Comment
+
+from ._benchmark import rate, scratch_database, timer
+
+PAGES = (
+    "index", "view_listing", "notifications_show", "display_watchlist", "display_category",
+    "category_listings",
+)
+
+
+def urlconf(module):
+    """Return the app's URLs with the read-only pages served by ``module``."""
+    conf = ModuleType(f"bench_urls_{module.__name__.rpartition('.')[2]}")
+    conf.urlpatterns = [
+        URLPattern(pattern.pattern, getattr(module, pattern.name),
+                   pattern.default_args, pattern.name)
+        if pattern.name in PAGES else pattern
+        for pattern in urls.urlpatterns
+    ]
+    return conf
+
+
+class Command(BaseCommand):
+    help = "Benchmark page throughput: sync views under WSGI vs async views under ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--requests", type=int, default=10,
+                            help="Requests per concurrent user.")
+        parser.add_argument("--wsgi-threads", type=int, default=8,
+                            help="Worker threads of the WSGI server.")
+        parser.add_argument("--db-latency", type=float, default=2.0,
+                            help="Milliseconds of simulated latency per query.")
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def handle(self, *args, **options):
+        with scratch_database():
+            users, paths = self.seed(options["listings"], options["concurrency"])
+            delay = options["db_latency"] / 1000
+
+            def latency(execute, sql, params, many, context):
+                time.sleep(delay)
+                return execute(sql, params, many, context)
+
+            def instrument(sender, connection, **kwargs):
+                connection.execute_wrappers.append(latency)
+
+            total = len(users) * options["requests"]
+            connection_created.connect(instrument)
+            try:
+                with override_settings(ROOT_URLCONF=urlconf(views)):
+                    wsgi = self.wsgi(users, paths, options["requests"], options["wsgi_threads"])
+                with override_settings(ROOT_URLCONF=urlconf(async_views)):
+                    asgi = asyncio.run(self.asgi(users, paths, options["requests"]))
+            finally:
+                connection_created.disconnect(instrument)
+        self.stdout.write(
+            f"WSGI, sync views:  {rate(total, wsgi):.0f} requests/s "
+            f"({options['wsgi_threads']} threads)"
+        )
+        self.stdout.write(
+            f"ASGI, async views: {rate(total, asgi):.0f} requests/s "
+            f"({len(users)} coroutines, {wsgi / asgi:.2f}x)"
+        )
+
+    def seed(self, total, concurrency):
+        owner = User.objects.create(username="bench-owner")
+        category = Category.objects.create(name="Benchmark")
+        listings = Listing.objects.bulk_create(
+            Listing(
+                title=f"Listing {i}",
+                description="Benchmark listing",
+                starting_bid=Decimal("1.00"),
+                current_price=Decimal("1.00"),
+                image_url="https://example.com/bench.jpg",
+                owner=owner,
+                category=category,
+            )
+            for i in range(total)
+        )
+        Comment.objects.bulk_create(
+            Comment(listing=listing, author=owner, content="Benchmark comment")
+            for listing in listings for _ in range(3)
+        )
+        users = User.objects.bulk_create(
+            User(username=f"bench-user{i}") for i in range(concurrency)
+        )
+        for user, listing in zip(users, listings * concurrency):
+            listing.watchers.add(user)
+        paths = [reverse("index"), reverse("category_listings", args=[category.id])] + [
+            reverse("view_listing", args=[listing.id]) for listing in listings[:20]
+        ]
+        return users, paths
+
+    def wsgi(self, users, paths, requests, threads):
+        def visit(user):
+            client = Client()
+            client.force_login(user)
+            for i in range(requests):
+                response = client.get(paths[(user.id + i) % len(paths)])
+                assert response.status_code == 200, response.status_code
+            connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            with timer() as elapsed:
+                list(pool.map(visit, users))
+        return elapsed["seconds"]
+
+    async def asgi(self, users, paths, requests):
+        async def visit(user):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            for i in range(requests):
+                # Like ASGIHandler, give every request its own thread for
+                # sync code; the test client shares one between all requests.
+                async with ThreadSensitiveContext():
+                    response = await client.get(paths[(user.id + i) % len(paths)])
+                assert response.status_code == 200, response.status_code
+
+        with timer() as elapsed:
+            await asyncio.gather(*(visit(user) for user in users))
+        return elapsed["seconds"]
@@ -0,0 +1,124 @@
+"""
+Size password hashing and measure the authentication hot path.
+
+Times one PBKDF2 hash at several iteration counts (Django's default and
+fractions of it, or ``--iterations``), and with ``--target-ms`` reports
+the count that hashes in that time on this machine, the value to put in
+``settings.PASSWORD_HASH_ITERATIONS``. Then, on a scratch database,
+measures logins per second through the login view at Django's default
+and at the sized count, and authenticated page views per second with the
+session table or cache, signed cookies, and with and without the user
+cache, counting the session and user queries of each request. Sessions
+and users are cached in the process-local default cache, leaving the
+shared cache of the running site alone.
+"""
+
+import statistics
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from auctions.auth import PBKDF2PasswordHasher, forget_users
+from auctions.models import User
+
+from ._benchmark import rate, scratch_database, timer
+
+DEFAULT_ITERATIONS = hashers.PBKDF2PasswordHasher.iterations
+
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+BACKENDS = {
+    "model": "django.contrib.auth.backends.ModelBackend",
+    "cached": "auctions.auth.CachedUserBackend",
+}
+
+
+def hash_ms(iterations, repeat):
+    """Return the median milliseconds of one hash with ``iterations``."""
+    hasher = PBKDF2PasswordHasher()
+    salt = hasher.salt()
+    times = []
+    for _ in range(repeat):
+        with timer() as elapsed:
+            hasher.encode("correct horse battery staple", salt, iterations)
+        times.append(elapsed["seconds"] * 1000)
+    return statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = "Benchmark password hashing, logins/s and the per-request cost of sessions and users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, nargs="*",
+                            help="PBKDF2 iteration counts to time (default: fractions "
+                                 "of Django's default).")
+        parser.add_argument("--target-ms", type=float,
+                            help="Report the iteration count that hashes in this time.")
+        parser.add_argument("--hashes", type=int, default=5,
+                            help="Hashes timed per iteration count.")
+        parser.add_argument("--logins", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=300)
+
+    def handle(self, *args, **options):
+        counts = options["iterations"] or [
+            DEFAULT_ITERATIONS // divisor for divisor in (1, 2, 4, 10)
+        ]
+        for iterations in counts:
+            milliseconds = hash_ms(iterations, options["hashes"])
+            self.stdout.write(f"{iterations:>9,} iterations: {milliseconds:7.1f} ms/hash")
+        sized = None
+        if options["target_ms"]:
+            per_iteration = hash_ms(DEFAULT_ITERATIONS, options["hashes"]) / DEFAULT_ITERATIONS
+            sized = int(options["target_ms"] / per_iteration)
+            self.stdout.write(
+                f"PASSWORD_HASH_ITERATIONS = {sized}  # about {options['target_ms']:g} ms per hash"
+            )
+
+        with override_settings(ALLOWED_HOSTS=["testserver"], SESSION_CACHE_ALIAS="default",
+                               USER_CACHE="default"), scratch_database():
+            user = User.objects.create_user("bench-user", password="pw")
+            for iterations in [DEFAULT_ITERATIONS] + ([sized] if sized else []):
+                self.logins(user, iterations, options["logins"])
+            for mode, engine in SESSION_ENGINES.items():
+                for name, backend in BACKENDS.items():
+                    with override_settings(SESSION_ENGINE=engine,
+                                           AUTHENTICATION_BACKENDS=[backend]):
+                        self.page_views(user, f"{mode}/{name}", options["requests"])
+
+    def logins(self, user, iterations, count):
+        with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+            user.set_password("pw")
+            user.save()
+            url = reverse("login")
+            with timer() as elapsed:
+                for _ in range(count):
+                    Client().post(url, {"username": user.username, "password": "pw"})
+        self.stdout.write(
+            f"logins at {iterations:,} iterations: {rate(count, elapsed['seconds']):.1f}/s"
+        )
+
+    def page_views(self, user, label, count):
+        client = Client()
+        client.force_login(user)
+        forget_users([user.id])
+        url = reverse("notifications_show")
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            with timer() as elapsed:
+                for _ in range(count):
+                    client.get(url)
+        auth_queries = sum(
+            'FROM "auctions_user"' in query["sql"] or "django_session" in query["sql"]
+            for query in context.captured_queries
+        )
+        self.stdout.write(
+            f"{label:<22} {rate(count, elapsed['seconds']):6.0f} requests/s, "
+            f"{auth_queries / count:.1f} session/user queries per request"
+        )
@@ -0,0 +1,121 @@
+"""
+Multi-threaded load benchmark for the bid placement service.
+
+Every worker thread repeatedly reads the current price of a shared listing
+and bids a random increment above it, so most bids race against each
+other. At the end the command checks that no accepted bid was lost:
+the listing's price equals the highest Bid, every accepted bid has a row,
+and bid amounts strictly increase in insertion order.
+"""
+
+import random
+import threading
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Max
+
+from auctions.bidding import BidError, place_bid
+from auctions.models import User, Category, Listing, Bid, Notification
+
+from ._benchmark import rate, scratch_database, timer
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent bid placement and verify there are no lost updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--bids", type=int, default=200,
+                            help="Bids attempted by each thread.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.run(options["threads"], options["bids"], options["seed"])
+
+    def run(self, threads, bids_per_thread, seed):
+        category = Category.objects.create(name="Benchmark")
+        owner = User.objects.create(username="bench-owner")
+        bidders = User.objects.bulk_create(
+            User(username=f"bench-bidder-{i}") for i in range(threads)
+        )
+        listing = Listing.objects.create(
+            title="Benchmark listing",
+            description="Contended listing",
+            starting_bid=Decimal("1.00"),
+            current_price=Decimal("1.00"),
+            image_url="https://example.com/bench.jpg",
+            owner=owner,
+            category=category,
+        )
+
+        counts = {"accepted": 0, "rejected": 0, "locked": 0}
+        lock = threading.Lock()
+        start = threading.Barrier(threads)
+
+        def worker(index):
+            rng = random.Random(seed + index)
+            bidder = bidders[index]
+            local = {"accepted": 0, "rejected": 0, "locked": 0}
+            try:
+                start.wait()
+                for _ in range(bids_per_thread):
+                    price = Listing.objects.values_list(
+                        "current_price", flat=True
+                    ).get(id=listing.id)
+                    amount = price + Decimal(rng.randint(1, 500)) / 100
+                    try:
+                        place_bid(listing.id, bidder, amount)
+                        local["accepted"] += 1
+                    except BidError:
+                        local["rejected"] += 1
+                    except OperationalError:
+                        local["locked"] += 1
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in local.items():
+                        counts[key] += value
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        with timer() as elapsed:
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+
+        attempted = threads * bids_per_thread
+        self.stdout.write(
+            f"threads={threads} attempted={attempted} accepted={counts['accepted']} "
+            f"rejected={counts['rejected']} locked={counts['locked']}"
+        )
+        self.stdout.write(
+            f"elapsed={elapsed['seconds']:.2f}s "
+            f"attempts/s={rate(attempted, elapsed['seconds']):.1f} "
+            f"accepted bids/s={rate(counts['accepted'], elapsed['seconds']):.1f}"
+        )
+        self.verify(listing, counts["accepted"])
+
+    def verify(self, listing, accepted):
+        """Raise CommandError if any accepted bid was lost."""
+        listing.refresh_from_db()
+        amounts = list(
+            Bid.objects.filter(listing=listing).order_by("id").values_list("amount", flat=True)
+        )
+        top = Bid.objects.filter(listing=listing).aggregate(top=Max("amount"))["top"]
+        problems = []
+        if len(amounts) != accepted:
+            problems.append(f"{accepted} bids accepted but {len(amounts)} stored")
+        if top is not None and listing.current_price != top:
+            problems.append(f"current_price {listing.current_price} != top bid {top}")
+        if any(later <= earlier for earlier, later in zip(amounts, amounts[1:])):
+            problems.append("bid amounts are not strictly increasing")
+        if Notification.objects.filter(listing=listing).count() != accepted:
+            problems.append("notification count does not match accepted bids")
+        if problems:
+            raise CommandError("Lost updates detected: " + "; ".join(problems))
+        self.stdout.write(self.style.SUCCESS(
+            f"OK: 0 lost updates, final price {listing.current_price}"
+        ))
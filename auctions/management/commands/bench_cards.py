@@ -0,0 +1,68 @@
+"""
+Measure listing pages rendered per second with a cold and a warm card cache.
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from auctions.cards import card_cache
+from auctions.models import User, Category, Listing
+
+from ._benchmark import rate, scratch_database, timer
+
+
+class Command(BaseCommand):
+    help = "Benchmark index/category page rendering with cold vs warm listing card caches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=300)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options["listings"])
+            self.run(options["requests"])
+
+    def seed(self, total):
+        owner = User.objects.create(username="bench-owner")
+        category = Category.objects.create(name="Benchmark")
+        Listing.objects.bulk_create(
+            Listing(
+                title=f"Listing {i}",
+                description=" ".join(f"word{j}" for j in range(60)),
+                starting_bid=Decimal("1.00"),
+                current_price=Decimal("1.00"),
+                image_url="https://example.com/bench.jpg",
+                owner=owner,
+                category=category,
+            )
+            for i in range(total)
+        )
+        self.viewer = User.objects.create(username="bench-viewer")
+        self.category = category
+
+    def pages_per_second(self, client, urls, requests, cold):
+        cache = card_cache()
+        with timer() as elapsed:
+            for i in range(requests):
+                if cold:
+                    cache.clear()
+                response = client.get(urls[i % len(urls)])
+                assert response.status_code == 200, response.status_code
+        return rate(requests, elapsed["seconds"])
+
+    def run(self, requests):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(self.viewer)
+        urls = [
+            reverse("index"),
+            reverse("category_listings", args=[self.category.id]),
+        ]
+        cold = self.pages_per_second(client, urls, requests, cold=True)
+        card_cache().clear()
+        warm = self.pages_per_second(client, urls, requests, cold=False)
+        self.stdout.write(f"cold cache: {cold:.1f} pages/s")
+        self.stdout.write(f"warm cache: {warm:.1f} pages/s ({warm / cold:.2f}x)")
@@ -0,0 +1,172 @@
+"""
+Load test for the Server-Sent Events streams.
+
+Starts the project's ASGI application under a local uvicorn server in a
+background thread, opens many idle listing streams against it, then
+publishes events through the in-process hub and measures how long each
+event takes to reach every connection.
+"""
+
+import asyncio
+import json
+import resource
+import socket
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from auctions.events import hub, listing_channel
+from auctions.models import User, Category, Listing
+
+from ._benchmark import rate, scratch_database, timer
+
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def raise_file_limit(wanted):
+    """Raise the open file limit towards ``wanted``; return the new soft limit."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+
+class Command(BaseCommand):
+    help = "Hold many idle SSE connections on one ASGI worker and time event fan-out."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=2000)
+        parser.add_argument("--events", type=int, default=20)
+        parser.add_argument("--host", default="127.0.0.1")
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError("bench_events needs uvicorn: pip install uvicorn")
+
+        connections = options["connections"]
+        limit = raise_file_limit(connections * 2 + 100)
+        if limit < connections * 2 + 100:
+            raise CommandError(f"Open file limit {limit} is too low for {connections} connections.")
+
+        with scratch_database():
+            owner = User.objects.create(username="bench-owner")
+            listing = Listing.objects.create(
+                title="Benchmark listing",
+                description="Streamed listing",
+                starting_bid=Decimal("1.00"),
+                current_price=Decimal("1.00"),
+                image_url="https://example.com/bench.jpg",
+                owner=owner,
+                category=Category.objects.create(name="Benchmark"),
+            )
+            client = Client(HTTP_HOST="localhost")
+            client.force_login(owner)
+            cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+            host, port = options["host"], free_port(options["host"])
+            server = uvicorn.Server(uvicorn.Config(
+                get_asgi_application(), host=host, port=port,
+                lifespan="off", log_level="warning", backlog=connections,
+            ))
+            thread = threading.Thread(target=server.run, daemon=True)
+            thread.start()
+            while not server.started:
+                time.sleep(0.05)
+            try:
+                asyncio.run(self.load(
+                    host, port, reverse("listing_events", args=[listing.id]),
+                    cookie, listing_channel(listing.id), connections, options["events"],
+                ))
+            finally:
+                server.should_exit = True
+                thread.join()
+
+    async def open_stream(self, host, port, path, cookie):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n"
+            f"Cookie: {settings.SESSION_COOKIE_NAME}={cookie}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status = await reader.readline()
+        if b" 200 " not in status:
+            raise CommandError(f"Stream request failed: {status!r}")
+        return reader, writer
+
+    async def read_events(self, reader, arrivals, done, expected):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"data: "):
+                seq = json.loads(line[6:])["seq"]
+                arrivals[seq].append(time.perf_counter())
+                if len(arrivals[seq]) == expected:
+                    done[seq].set()
+
+    async def load(self, host, port, path, cookie, channel, connections, events):
+        gate = asyncio.Semaphore(200)
+
+        async def connect():
+            async with gate:
+                return await self.open_stream(host, port, path, cookie)
+
+        with timer() as elapsed:
+            streams = await asyncio.gather(*(connect() for _ in range(connections)))
+            while hub.subscriber_count(channel) < connections:
+                await asyncio.sleep(0.05)
+        self.stdout.write(
+            f"opened {connections} streams in {elapsed['seconds']:.2f}s "
+            f"({rate(connections, elapsed['seconds']):.0f} connections/s)"
+        )
+
+        arrivals = [[] for _ in range(events)]
+        done = [asyncio.Event() for _ in range(events)]
+        readers = [
+            asyncio.create_task(self.read_events(reader, arrivals, done, connections))
+            for reader, _ in streams
+        ]
+
+        fan_out = []
+        with timer() as elapsed:
+            for seq in range(events):
+                sent = time.perf_counter()
+                hub.publish(channel, "bid", {"seq": seq})
+                await asyncio.wait_for(done[seq].wait(), timeout=60)
+                fan_out.append((max(arrivals[seq]) - sent) * 1000)
+
+        deliveries = connections * events
+        latencies = sorted(
+            (arrival - min(times)) * 1000 for times in arrivals for arrival in times
+        )
+        self.stdout.write(
+            f"{events} events x {connections} streams: {deliveries} deliveries in "
+            f"{elapsed['seconds']:.2f}s ({rate(deliveries, elapsed['seconds']):.0f} deliveries/s)"
+        )
+        self.stdout.write(
+            f"fan-out to all streams: p50={statistics.median(fan_out):.1f}ms "
+            f"max={max(fan_out):.1f}ms; spread between streams: "
+            f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}ms"
+        )
+        self.stdout.write(
+            f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB"
+        )
+
+        for task in readers:
+            task.cancel()
+        for _, writer in streams:
+            writer.close()
@@ -0,0 +1,84 @@
+"""
+Compare OFFSET pagination (Django's Paginator) against keyset pagination
+on the active listing feed at increasing page depths.
+"""
+
+import statistics
+from decimal import Decimal
+
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+
+from auctions.models import User, Category, Listing
+from auctions.pagination import NEXT, encode_cursor, paginate
+
+from ._benchmark import scratch_database, timer
+
+
+class Command(BaseCommand):
+    help = "Benchmark page latency of OFFSET vs keyset pagination across page depth."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=300_000)
+        parser.add_argument("--per-page", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options["listings"], options["batch_size"])
+            self.run(options["per_page"], options["repeat"])
+
+    def seed(self, total, batch_size):
+        owner = User.objects.create(username="bench-owner")
+        category = Category.objects.create(name="Benchmark")
+        with timer() as elapsed:
+            for start in range(0, total, batch_size):
+                Listing.objects.bulk_create(
+                    Listing(
+                        title=f"Listing {i}",
+                        description="Benchmark listing",
+                        starting_bid=Decimal("1.00"),
+                        current_price=Decimal("1.00"),
+                        active=i % 10 != 0,
+                        image_url="https://example.com/bench.jpg",
+                        owner=owner,
+                        category=category,
+                    )
+                    for i in range(start, min(start + batch_size, total))
+                )
+        self.stdout.write(f"seeded {total} listings in {elapsed['seconds']:.1f}s")
+
+    def measure(self, fetch, repeat):
+        samples = []
+        for _ in range(repeat):
+            with timer() as elapsed:
+                fetch()
+            samples.append(elapsed["seconds"] * 1000)
+        return statistics.median(samples)
+
+    def run(self, per_page, repeat):
+        active = Listing.objects.filter(active=True)
+        pages = -(-active.count() // per_page)
+        depths = sorted({d for d in (1, 10, 100, 1_000, 10_000, pages) if d <= pages})
+
+        self.stdout.write(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+        for depth in depths:
+            if depth == 1:
+                cursor = None
+            else:
+                boundary = active.order_by("-pk").values_list("pk", flat=True)[
+                    (depth - 1) * per_page - 1
+                ]
+                cursor = encode_cursor(NEXT, boundary)
+
+            def offset_page():
+                list(Paginator(active.order_by("-pk"), per_page).get_page(depth))
+
+            def keyset_page():
+                list(paginate(active, cursor, per_page))
+
+            self.stdout.write(
+                f"{depth:>8} {self.measure(offset_page, repeat):>10.2f} "
+                f"{self.measure(keyset_page, repeat):>10.2f}"
+            )
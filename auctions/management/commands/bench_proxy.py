@@ -0,0 +1,120 @@
+"""
+Benchmark proxy bidding with thousands of competing maxima.
+
+First compares, in memory, settling every new maximum with the engine's
+top-two rule against replaying the bid war one increment at a time. Then
+has every bidder submit a maximum through place_proxy_bid on a scratch
+database, in ascending order so that every maximum is accepted and
+outbids the leader (the worst case), and reports maxima per second and
+the Bid rows written.
+"""
+
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from auctions.bidding import (
+    BID_INCREMENT, BidError, ProxyEntry, TopTwo, place_proxy_bid, proxy_outcome
+)
+from auctions.models import User, Category, Listing, Bid
+
+from ._benchmark import rate, scratch_database, timer
+
+START_PRICE = Decimal("1.00")
+
+
+def maxima(count, seed):
+    rng = random.Random(seed)
+    return [Decimal(rng.randrange(200, 2_000_000)) / 100 for _ in range(count)]
+
+
+def settle_top_two(amounts):
+    """Apply every maximum with the engine's rule; return (price, bids)."""
+    top = TopTwo()
+    price, leader, bids = START_PRICE, None, 0
+    for user_id, amount in enumerate(amounts):
+        top.push(ProxyEntry(amount, user_id, user_id, user_id, ""))
+        for entry, bid in proxy_outcome(top, price, leader):
+            price, leader, bids = bid, entry.user_id, bids + 1
+    return price, bids
+
+
+def replay_war(amounts):
+    """Apply every maximum by replaying the bid war one increment at a time."""
+    price, leader, bids = START_PRICE, None, 0
+    best = {}
+    for user_id, amount in enumerate(amounts):
+        best[user_id] = amount
+        while True:
+            challengers = [
+                (maximum, user) for user, maximum in best.items()
+                if user != leader and maximum > price
+            ]
+            if not challengers:
+                break
+            maximum, user = max(challengers)
+            price, leader, bids = min(maximum, price + BID_INCREMENT), user, bids + 1
+    return price, bids
+
+
+class Command(BaseCommand):
+    help = "Benchmark settling competing proxy bids: top-two rule vs bid war replay."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--proxies", type=int, default=5_000)
+        parser.add_argument("--replay-proxies", type=int, default=300,
+                            help="Maxima for the (much slower) bid war replay.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.in_memory(options["proxies"], options["replay_proxies"], options["seed"])
+        with scratch_database():
+            self.database(options["proxies"], options["seed"])
+
+    def in_memory(self, count, replay_count, seed):
+        amounts = maxima(count, seed)
+        with timer() as elapsed:
+            price, bids = settle_top_two(amounts)
+        self.stdout.write(
+            f"top-two rule: {count} maxima in {elapsed['seconds'] * 1000:.1f} ms, "
+            f"{bids} bids, final price {price}"
+        )
+        amounts = amounts[:replay_count]
+        with timer() as elapsed:
+            price, bids = replay_war(amounts)
+        self.stdout.write(
+            f"war replay:   {replay_count} maxima in {elapsed['seconds'] * 1000:.1f} ms, "
+            f"{bids} bids, final price {price}"
+        )
+
+    def database(self, count, seed):
+        owner = User.objects.create(username="bench-owner")
+        category = Category.objects.create(name="Benchmark")
+        listing = Listing.objects.create(
+            title="Contested listing",
+            description="Benchmark listing",
+            starting_bid=START_PRICE,
+            current_price=START_PRICE,
+            image_url="https://example.com/bench.jpg",
+            owner=owner,
+            category=category,
+        )
+        bidders = User.objects.bulk_create(
+            User(username=f"bench-bidder{i}") for i in range(count)
+        )
+        accepted = 0
+        with timer() as elapsed:
+            for bidder, amount in zip(bidders, sorted(maxima(count, seed))):
+                try:
+                    place_proxy_bid(listing.id, bidder, amount)
+                    accepted += 1
+                except BidError:
+                    # Maxima at or below the current price are rejected.
+                    pass
+        listing.refresh_from_db()
+        self.stdout.write(
+            f"database:     {rate(count, elapsed['seconds']):.0f} maxima/s, "
+            f"{accepted} accepted, {Bid.objects.count()} bids written, "
+            f"final price {listing.current_price}"
+        )
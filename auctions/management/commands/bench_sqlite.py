@@ -0,0 +1,144 @@
+"""
+Concurrent read/write benchmark for the SQLite connection settings.
+
+Runs the same mixed workload twice on a scratch database: once with
+SQLite's defaults (rollback journal, no busy timeout, deferred
+transactions) and once with the project's settings (SQLITE_PRAGMAS and
+the database OPTIONS). Writer processes place bids while reader processes
+page through the active feed and load bid histories, like the workers of
+a multi-process deployment. Reports operations per second and "database
+is locked" errors for each configuration.
+"""
+
+import multiprocessing
+import random
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+
+from auctions.bidding import BidError, place_bid
+from auctions.models import User, Category, Listing, Bid
+from auctions.pagination import paginate
+
+from ._benchmark import rate, scratch_database, timer
+
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 0}
+BASELINE_OPTIONS = {"timeout": 0.001}
+
+
+def writer(listing_ids, bidder, deadline, counts):
+    rng = random.Random(bidder.id)
+    amount = Decimal(2)
+    while time.monotonic() < deadline:
+        amount += 1
+        try:
+            place_bid(rng.choice(listing_ids), bidder, amount)
+            counts["bids"] += 1
+        except BidError:
+            counts["bids"] += 1
+        except OperationalError:
+            counts["locked"] += 1
+
+
+def reader(listing_ids, seed, deadline, counts):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        try:
+            list(paginate(Listing.objects.filter(active=True), per_page=10))
+            list(Bid.objects.filter(listing_id=rng.choice(listing_ids)).order_by("-amount")[:10])
+            counts["reads"] += 1
+        except OperationalError:
+            counts["locked"] += 1
+
+
+def work(target, listing_ids, argument, seconds, results):
+    """Run ``target`` in a worker process for ``seconds`` and report its counts."""
+    counts = Counter()
+    try:
+        target(listing_ids, argument, time.monotonic() + seconds, counts)
+    finally:
+        connections.close_all()
+        results.put(counts)
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent bid and read throughput with default and tuned SQLite settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--listings", type=int, default=200)
+
+    def handle(self, *args, **options):
+        tuned_options = connection.settings_dict.get("OPTIONS", {})
+        configurations = [
+            ("defaults", BASELINE_PRAGMAS, BASELINE_OPTIONS),
+            ("tuned", settings.SQLITE_PRAGMAS, tuned_options),
+        ]
+        for label, pragmas, db_options in configurations:
+            with override_settings(SQLITE_PRAGMAS=pragmas), scratch_database():
+                connection.settings_dict["OPTIONS"] = db_options
+                connection.close()
+                try:
+                    self.run(label, options)
+                finally:
+                    connection.settings_dict["OPTIONS"] = tuned_options
+                    connection.close()
+
+    def run(self, label, options):
+        owner = User.objects.create(username="bench-owner")
+        bidders = [
+            User.objects.create(username=f"bench-bidder{i}") for i in range(options["writers"])
+        ]
+        category = Category.objects.create(name="Benchmark")
+        Listing.objects.bulk_create(
+            Listing(
+                title=f"Listing {i}",
+                description="Benchmark listing",
+                starting_bid=Decimal("1.00"),
+                current_price=Decimal("1.00"),
+                image_url="https://example.com/bench.jpg",
+                owner=owner,
+                category=category,
+            )
+            for i in range(options["listings"])
+        )
+        listing_ids = list(Listing.objects.values_list("id", flat=True))
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        seconds = options["seconds"]
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [
+            context.Process(target=work, args=(writer, listing_ids, bidder, seconds, results))
+            for bidder in bidders
+        ]
+        workers += [
+            context.Process(target=work, args=(reader, listing_ids, i, seconds, results))
+            for i in range(options["readers"])
+        ]
+        connections.close_all()
+        with timer() as elapsed:
+            for process in workers:
+                process.start()
+            counts = Counter()
+            for _ in workers:
+                counts.update(results.get())
+            for process in workers:
+                process.join()
+
+        seconds = elapsed["seconds"]
+        self.stdout.write(
+            f"{label} (journal_mode={journal_mode}): "
+            f"{rate(counts['bids'], seconds):.0f} bids/s, "
+            f"{rate(counts['reads'], seconds):.0f} reads/s, "
+            f"{counts['locked']} 'database is locked' errors"
+        )
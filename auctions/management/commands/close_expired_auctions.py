@@ -0,0 +1,40 @@
+"""
+Close every auction whose deadline has passed.
+
+Run it from cron, or with ``--loop`` as a long-lived scheduler process.
+"""
+
+import threading
+
+from django.core.management.base import BaseCommand
+
+from auctions.closing import close_expired_listings, run_closer
+
+from ._benchmark import rate, timer
+
+
+class Command(BaseCommand):
+    help = "Close expired auctions in batches and notify their winners and owners."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Listings closed per transaction.")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep running, closing expired auctions every --interval seconds.")
+        parser.add_argument("--interval", type=int, default=30)
+
+    def handle(self, *args, **options):
+        if options["loop"]:
+            self.stdout.write(f"Closing expired auctions every {options['interval']}s.")
+            try:
+                run_closer(options["interval"], options["batch_size"], threading.Event())
+            except KeyboardInterrupt:
+                pass
+            return
+
+        with timer() as elapsed:
+            closed = close_expired_listings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {closed} expired auctions in {elapsed['seconds']:.2f}s "
+            f"({rate(closed, elapsed['seconds']):.0f} auctions/s)."
+        ))
@@ -0,0 +1,74 @@
+"""
+Apply the notification retention policy (see auctions.retention).
+
+Run it periodically, for example nightly from cron.
+"""
+
+import gzip
+import os
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from auctions.retention import (
+    compact_offer_notifications, prune_notifications, retention_cutoff
+)
+
+from ._benchmark import rate, timer
+
+
+class Command(BaseCommand):
+    help = "Compact offer notifications and delete or archive old read notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int,
+                            help="Keep read notifications this many days "
+                                 "(default: settings.NOTIFICATION_RETENTION_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows (or users, when compacting) per transaction.")
+        parser.add_argument("--pause", type=float, default=0,
+                            help="Seconds to sleep between batches.")
+        parser.add_argument("--archive",
+                            help="Append pruned rows to this JSON lines file (gzip if it ends in .gz).")
+        parser.add_argument("--no-compact", action="store_true",
+                            help="Skip summarizing repeated offer notifications.")
+        parser.add_argument("--vacuum", action="store_true",
+                            help="Run VACUUM afterwards to shrink the SQLite file.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        if not options["no_compact"]:
+            with timer() as elapsed:
+                compacted = compact_offer_notifications(batch_size)
+            self.report("compacted", compacted, elapsed["seconds"])
+
+        archive = options["archive"]
+        if archive is None:
+            archive_file = nullcontext()
+        elif archive.endswith(".gz"):
+            archive_file = gzip.open(archive, "at", encoding="utf-8")
+        else:
+            archive_file = open(archive, "a", encoding="utf-8")
+        with timer() as elapsed, archive_file as file:
+            pruned = prune_notifications(
+                retention_cutoff(options["days"]), batch_size, file, options["pause"]
+            )
+        self.report("archived and deleted" if archive else "deleted", pruned, elapsed["seconds"])
+
+        if options["vacuum"] and connection.vendor == "sqlite":
+            path = connection.settings_dict["NAME"]
+            before = os.path.getsize(path)
+            with timer() as elapsed:
+                with connection.cursor() as cursor:
+                    cursor.execute("VACUUM")
+            self.stdout.write(
+                f"vacuum: {(before - os.path.getsize(path)) / 2**20:.1f} MiB reclaimed "
+                f"in {elapsed['seconds']:.1f}s"
+            )
+
+    def report(self, label, count, seconds):
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {count} notifications in {seconds:.2f}s ({rate(count, seconds):.0f} rows/s)"
+        ))
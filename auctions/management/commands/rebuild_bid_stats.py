@@ -0,0 +1,32 @@
+"""
+Rebuild or verify the denormalized bid statistics on Listing.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.bidding import rebuild_bid_stats
+
+from ._benchmark import timer
+
+
+class Command(BaseCommand):
+    help = "Recompute Listing.bid_count, leading_bid and last_bid_at from the Bid table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true",
+                            help="Only report out-of-date listings; fail if any are found.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with timer() as elapsed:
+            stale = rebuild_bid_stats(
+                batch_size=options["batch_size"], dry_run=options["verify"]
+            )
+        if options["verify"]:
+            if stale:
+                raise CommandError(f"{stale} listings have out-of-date bid statistics.")
+            self.stdout.write(self.style.SUCCESS("All listing bid statistics are up to date."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt bid statistics for {stale} listings in {elapsed['seconds']:.2f}s."
+            ))
@@ -0,0 +1,24 @@
+"""
+Rebuild the full-text listing search index.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from auctions.search import install_search_index, rebuild_search_index, supports_fts
+
+from ._benchmark import timer
+
+
+class Command(BaseCommand):
+    help = "Recreate missing search index triggers and re-index every listing."
+
+    def handle(self, *args, **options):
+        if not supports_fts(connection):
+            raise CommandError("Full-text search needs SQLite; other databases use icontains.")
+        with timer() as elapsed:
+            if not install_search_index(connection):
+                rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index rebuilt in {elapsed['seconds']:.2f}s."
+        ))
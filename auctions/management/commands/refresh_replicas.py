@@ -0,0 +1,33 @@
+"""
+Refresh the local SQLite read replicas (settings.DATABASE_REPLICAS).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.routers import refresh_replica
+
+from ._benchmark import timer
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into every configured replica."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float,
+                            help="Keep refreshing every this many seconds.")
+
+    def handle(self, *args, **options):
+        aliases = list(settings.DATABASE_REPLICAS)
+        if not aliases:
+            raise CommandError("No replicas configured in settings.DATABASE_REPLICAS.")
+        while True:
+            for alias in aliases:
+                with timer() as elapsed:
+                    refresh_replica(alias)
+                self.stdout.write(f"{alias}: refreshed in {elapsed['seconds']:.2f}s")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
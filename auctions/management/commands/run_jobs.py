@@ -0,0 +1,50 @@
+"""
+Run the background job queue (see auctions.jobs).
+
+Keep one or more ``run_jobs`` processes running next to the web server;
+``--once`` drains the jobs that are due now and exits.
+"""
+
+import threading
+
+from django.core.management.base import BaseCommand
+
+from auctions.jobs import run_pending, run_worker
+from auctions.models import Job
+
+from ._benchmark import rate, timer
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs such as watcher notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Jobs claimed per query.")
+        parser.add_argument("--interval", type=float, default=1,
+                            help="Seconds to sleep while no job is due.")
+        parser.add_argument("--once", action="store_true",
+                            help="Run the jobs that are due now, then exit.")
+
+    def handle(self, *args, **options):
+        if not options["once"]:
+            self.stdout.write(f"Running jobs (polling every {options['interval']}s).")
+            try:
+                run_worker(options["interval"], options["batch_size"], threading.Event())
+            except KeyboardInterrupt:
+                pass
+            return
+
+        succeeded = failed = 0
+        with timer() as elapsed:
+            while True:
+                done, errors = run_pending(options["batch_size"])
+                succeeded += done
+                failed += errors
+                if done + errors < options["batch_size"]:
+                    break
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {succeeded + failed} jobs in {elapsed['seconds']:.2f}s "
+            f"({rate(succeeded + failed, elapsed['seconds']):.0f} jobs/s), {failed} failed; "
+            f"{Job.objects.filter(failed=True).count()} jobs have given up."
+        ))
@@ -0,0 +1,247 @@
+"""
+Generate realistic auction data in bulk for development and load testing.
+
+Every row is produced from a seeded RNG, written with batched bulk_create,
+and all users share one precomputed password hash, so millions of rows can
+be generated in minutes. Bids on a listing are strictly increasing and the
+listing's price and bid statistics are written to match them.
+
+By default the command tops up: users ``user1..userN`` and categories
+``Category 1..N`` are created only if missing, and listings are created
+only up to the requested total, so rerunning it is a no-op. ``--append``
+adds the requested amounts on top of what already exists. Bids and
+comments are generated for the listings created by the current run.
+"""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from auctions.categories import forget_counts
+from auctions.models import User, Category, Listing, Bid, Comment
+
+from ._benchmark import rate, timer
+
+WORDS = (
+    "vintage laptop camera guitar bicycle watch lamp chair desk phone tablet "
+    "speaker jacket boots console keyboard monitor printer drone lens book "
+    "poster vinyl record sofa mirror rug kettle blender toaster mixer"
+).split()
+
+IMAGE_URL = "https://images.pexels.com/photos/1006293/pexels-photo-1006293.jpeg"
+
+
+class Command(BaseCommand):
+    help = "Seed the database with users, categories, listings, bids and comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=30)
+        parser.add_argument("--categories", type=int, default=30)
+        parser.add_argument("--listings", type=int, default=30)
+        parser.add_argument("--bids", type=int, default=30,
+                            help="Bids spread over the listings created by this run.")
+        parser.add_argument("--comments", type=int, default=30,
+                            help="Comments spread over the listings created by this run.")
+        parser.add_argument("--seed", type=int, default=0, help="RNG seed.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="password123",
+                            help="Password shared by every generated user.")
+        parser.add_argument("--append", action="store_true",
+                            help="Add rows on top of existing data instead of topping up.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.append = options["append"]
+        self.now = timezone.now()
+
+        with timer() as total:
+            user_ids = self.seed_users(options["users"], options["password"])
+            category_ids = self.seed_categories(options["categories"])
+            listings = self.seed_listings(options["listings"], user_ids, category_ids)
+            self.seed_bids(options["bids"], listings, user_ids)
+            self.seed_comments(options["comments"], listings, user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Done in {total['seconds']:.1f}s."))
+
+    def report(self, label, count, seconds):
+        self.stdout.write(
+            f"{label}: {count} rows in {seconds:.1f}s ({rate(count, seconds):.0f} rows/s)"
+        )
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"  {label}: {done}/{total}", ending="\r")
+        self.stdout.flush()
+
+    def batches(self, total):
+        """Yield ``(start, stop)`` ranges covering ``range(total)``."""
+        for start in range(0, total, self.batch_size):
+            yield start, min(start + self.batch_size, total)
+
+    def seed_users(self, count, password):
+        users = User.objects.filter(username__startswith="user")
+        before = users.count()
+        # Top-up mode regenerates the same names and lets conflicts drop them.
+        start = before + 1 if self.append else 1
+        password_hash = make_password(password)
+        with timer() as elapsed:
+            for low, high in self.batches(count):
+                User.objects.bulk_create(
+                    (
+                        User(
+                            username=f"user{start + i}",
+                            email=f"user{start + i}@example.com",
+                            password=password_hash,
+                        )
+                        for i in range(low, high)
+                    ),
+                    ignore_conflicts=True,
+                )
+                self.progress("users", high, count)
+        self.report("users", users.count() - before, elapsed["seconds"])
+        return list(User.objects.values_list("id", flat=True))
+
+    def seed_categories(self, count):
+        categories = Category.objects.filter(name__startswith="Category ")
+        before = categories.count()
+        start = before + 1 if self.append else 1
+        with timer() as elapsed:
+            Category.objects.bulk_create(
+                (Category(name=f"Category {start + i}") for i in range(count)),
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        self.report("categories", categories.count() - before, elapsed["seconds"])
+        return list(Category.objects.values_list("id", flat=True))
+
+    def seed_listings(self, wanted, user_ids, category_ids):
+        """Create listings and return ``[(id, starting_bid)]`` of the new rows."""
+        count = wanted if self.append else max(0, wanted - Listing.objects.count())
+        created = []
+        rng = self.rng
+        with timer() as elapsed:
+            for low, high in self.batches(count):
+                batch = []
+                for _ in range(low, high):
+                    price = Decimal(rng.randint(100, 500_000)) / 100
+                    name = " ".join(rng.choice(WORDS) for _ in range(2)).title()
+                    batch.append(Listing(
+                        title=name[:50],
+                        description=" ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))),
+                        starting_bid=price,
+                        current_price=price,
+                        image_url=IMAGE_URL,
+                        owner_id=rng.choice(user_ids),
+                        category_id=rng.choice(category_ids),
+                    ))
+                Listing.objects.bulk_create(batch)
+                created.extend((listing.id, listing.starting_bid) for listing in batch)
+                self.progress("listings", high, count)
+        # bulk_create skips the signals that keep category counts current.
+        forget_counts()
+        self.report("listings", count, elapsed["seconds"])
+        return created
+
+    def spread(self, total, listings):
+        """Yield ``(listing_id, starting_bid, n)`` spreading ``total`` rows evenly."""
+        if not listings:
+            return
+        quotient, remainder = divmod(total, len(listings))
+        for index, (listing_id, starting_bid) in enumerate(listings):
+            yield listing_id, starting_bid, quotient + (index < remainder)
+
+    def seed_bids(self, total, listings, user_ids):
+        """Create increasing bids and write matching price and bid statistics."""
+        rng = self.rng
+        done = 0
+        pending_bids = []
+        pending_listings = []
+
+        def flush():
+            Bid.objects.bulk_create(pending_bids)
+            leaders = {}
+            for bid in pending_bids:
+                leaders[bid.listing_id] = bid
+            for listing in pending_listings:
+                leader = leaders[listing.id]
+                listing.current_price = leader.amount
+                listing.leading_bid_id = leader.id
+            self.update_listings(
+                pending_listings,
+                ["current_price", "bid_count", "leading_bid", "last_bid_at"],
+            )
+            pending_bids.clear()
+            pending_listings.clear()
+
+        with timer() as elapsed:
+            for listing_id, amount, count in self.spread(total, listings):
+                if not count:
+                    continue
+                last_bid_at = self.now - timedelta(seconds=rng.randint(0, 30 * 86400))
+                for i in range(count):
+                    amount += Decimal(rng.randint(1, 5000)) / 100
+                    pending_bids.append(Bid(
+                        amount=amount, bidder_id=rng.choice(user_ids), listing_id=listing_id,
+                        # One minute apart, the last one at last_bid_at.
+                        timestamp=last_bid_at - timedelta(minutes=count - 1 - i),
+                    ))
+                pending_listings.append(Listing(
+                    id=listing_id,
+                    bid_count=count,
+                    last_bid_at=last_bid_at,
+                ))
+                done += count
+                if len(pending_bids) >= self.batch_size:
+                    with transaction.atomic():
+                        flush()
+                    self.progress("bids", done, total)
+            if pending_bids:
+                with transaction.atomic():
+                    flush()
+        self.report("bids", done, elapsed["seconds"])
+
+    def update_listings(self, listings, field_names):
+        """
+        Write ``field_names`` of many listings with one executemany UPDATE.
+
+        bulk_update builds a CASE expression per field and row, which made it
+        the dominant cost of seeding bids.
+        """
+        quote = connection.ops.quote_name
+        fields = [Listing._meta.get_field(name) for name in field_names]
+        sql = "UPDATE {} SET {} WHERE {} = %s".format(
+            quote(Listing._meta.db_table),
+            ", ".join(f"{quote(field.column)} = %s" for field in fields),
+            quote(Listing._meta.pk.column),
+        )
+        params = [
+            [field.get_db_prep_save(getattr(listing, field.attname), connection) for field in fields]
+            + [listing.pk]
+            for listing in listings
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def seed_comments(self, total, listings, user_ids):
+        rng = self.rng
+        done = 0
+        pending = []
+        with timer() as elapsed:
+            for listing_id, _, count in self.spread(total, listings):
+                for _ in range(count):
+                    pending.append(Comment(
+                        content=f"This is the best {rng.choice(WORDS)}.",
+                        author_id=rng.choice(user_ids),
+                        listing_id=listing_id,
+                    ))
+                done += count
+                if len(pending) >= self.batch_size:
+                    Comment.objects.bulk_create(pending)
+                    pending.clear()
+                    self.progress("comments", done, total)
+            Comment.objects.bulk_create(pending)
+        self.report("comments", done, elapsed["seconds"])
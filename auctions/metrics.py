@@ -0,0 +1,224 @@
+"""
+Per-request performance metrics.
+
+``metrics_middleware`` times a sample of requests: wall time, time spent
+in SQL (``instrument_connection`` installs an execute wrapper on every new
+connection), the number of queries, how many of them repeated an earlier
+query of the same request with the same parameters, and time spent
+rendering templates (through the ``TimedDjangoTemplates`` backend). Each
+sampled response gets a ``Server-Timing`` header that browser developer
+tools display, and the sample is added to a rolling window of the view's
+last ``settings.METRICS_WINDOW`` samples, from which p50/p95/p99 are
+computed on demand (see the ``metrics_stats`` view).
+
+``settings.METRICS_SAMPLE_RATE`` is the fraction of requests sampled;
+requests left out only pay for one random() call. Windows live in process
+memory, so each worker process reports its own traffic.
+
+The request being sampled is tracked in a context variable, so queries
+run by sync views under ASGI (in a worker thread) are attributed too.
+Streaming responses (the Server-Sent Events streams) are not recorded:
+they last for minutes.
+
+Classes:
+- TimedDjangoTemplates: Template backend that times template rendering.
+
+Functions:
+- instrument_connection: Attribute a connection's queries to the sampled request.
+- metrics_middleware: Sample requests and record their metrics.
+- record: Add one sample to a view's window.
+- summary: Return percentiles of every view's window.
+- reset: Forget every sample.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.utils.decorators import sync_and_async_middleware
+
+METRICS = ("wall_ms", "db_ms", "queries", "duplicates", "template_ms")
+PERCENTILES = (50, 95, 99)
+
+_current = ContextVar("metrics_request", default=None)
+_windows = {}
+_lock = threading.Lock()
+
+
+def sample_rate():
+    return getattr(settings, "METRICS_SAMPLE_RATE", 1.0)
+
+
+def window_size():
+    return getattr(settings, "METRICS_WINDOW", 1000)
+
+
+class RequestMetrics:
+    """Query and template timings collected while serving one request."""
+
+    def __init__(self):
+        self.db = 0.0
+        self.template = 0.0
+        self.rendering = 0
+        self.queries = 0
+        self.seen = set()
+        self.duplicates = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        key = (sql, repr(params))
+        if key in self.seen:
+            self.duplicates += 1
+        else:
+            self.seen.add(key)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument_connection(connection):
+    """Time the queries of ``connection`` while a request is sampled."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Only the outermost render is timed; templates rendered while
+        # rendering another one (listing cards) are part of its time.
+        if metrics is None or metrics.rendering:
+            return self.template.render(context, request)
+        metrics.rendering += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template += time.perf_counter() - start
+            metrics.rendering -= 1
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def record(view, sample):
+    """Add ``sample`` (a dict of METRICS) to the rolling window of ``view``."""
+    with _lock:
+        window = _windows.get(view)
+        if window is None or window.maxlen != window_size():
+            window = _windows[view] = deque(window or (), maxlen=window_size())
+        window.append(sample)
+
+
+def _percentile(ordered, percent):
+    # Nearest-rank percentile of an ascending list.
+    index = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[index]
+
+
+def summary():
+    """Return ``{view: {"samples": n, metric: {"p50": .., "p95": .., "p99": ..}}}``."""
+    with _lock:
+        windows = {view: list(window) for view, window in _windows.items()}
+    result = {}
+    for view, samples in sorted(windows.items()):
+        stats = {"samples": len(samples)}
+        for metric in METRICS:
+            ordered = sorted(sample[metric] for sample in samples)
+            stats[metric] = {
+                f"p{percent}": round(_percentile(ordered, percent), 2) for percent in PERCENTILES
+            }
+        result[view] = stats
+    return result
+
+
+def reset():
+    """Forget every recorded sample."""
+    with _lock:
+        _windows.clear()
+
+
+def _server_timing(sample):
+    return (
+        f'app;dur={sample["wall_ms"]:.1f}, '
+        f'db;dur={sample["db_ms"]:.1f};desc="{sample["queries"]} queries, '
+        f'{sample["duplicates"]} duplicates", '
+        f'tpl;dur={sample["template_ms"]:.1f}'
+    )
+
+
+def _begin():
+    if random.random() >= sample_rate():
+        return None, None
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def _finish(request, response, metrics, start):
+    sample = {
+        "wall_ms": (time.perf_counter() - start) * 1000,
+        "db_ms": metrics.db * 1000,
+        "queries": metrics.queries,
+        "duplicates": metrics.duplicates,
+        "template_ms": metrics.template * 1000,
+    }
+    response["Server-Timing"] = _server_timing(sample)
+    if not response.streaming:
+        match = request.resolver_match
+        record(match.view_name if match else "<unresolved>", sample)
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Record the metrics of a sample of requests and add Server-Timing."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            metrics, token = _begin()
+            if metrics is None:
+                return await get_response(request)
+            start = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return _finish(request, response, metrics, start)
+    else:
+        def middleware(request):
+            metrics, token = _begin()
+            if metrics is None:
+                return get_response(request)
+            start = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            return _finish(request, response, metrics, start)
+    return middleware
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0002_listing_active_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='leading_bid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.bid'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE auctions_listing SET
+                bid_count = (
+                    SELECT COUNT(*) FROM auctions_bid
+                    WHERE auctions_bid.listing_id = auctions_listing.id
+                ),
+                leading_bid_id = (
+                    SELECT id FROM auctions_bid
+                    WHERE auctions_bid.listing_id = auctions_listing.id
+                    ORDER BY amount DESC, id
+                    LIMIT 1
+                )
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
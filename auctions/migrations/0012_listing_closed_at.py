@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_proxybid'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_closed_unarchived_idx',
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        # Closed before the field existed: the last update is the best
+        # estimate of the closing time.
+        migrations.RunSQL(
+            "UPDATE auctions_listing SET closed_at = updated_at WHERE NOT active",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('active', False), ('bids_archived', False)), fields=['closed_at'], name='listing_closed_unarchived_idx'),
+        ),
+    ]
@@ -6,14 +6,18 @@ Models:
 - Category: Represents a category for listings.
 - Listing: Represents an auction listing.
 - Bid: Represents a bid placed on a listing.
+- ArchivedBid: A bid of a closed listing moved out of the Bid table.
+- ProxyBid: A user's maximum for automatic bidding on a listing.
 - Comment: Represents a comment made on a listing.
 - Notification: Represents a notification for a user.
+- Job: A unit of background work waiting in the delivery queue.
 
 Each model includes fields and methods relevant to its purpose.
 """
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 class User(AbstractUser):
     """Extends the default Django AbstractUser model."""
@@ -25,6 +29,19 @@ class Category(models.Model):
     def __str__(self):
         return str(self.name)
 
+class ListingQuerySet(models.QuerySet):
+    def touch(self, **fields):
+        """
+        Update ``fields`` and bump ``version`` and ``updated_at`` of every
+        listing in the queryset. Returns the number of rows updated.
+        """
+        return self.update(
+            version=models.F("version") + 1,
+            updated_at=timezone.now(),
+            **fields
+        )
+
+
 class Listing(models.Model):
     """Represents an auction listing."""
     title = models.CharField(max_length=50)
@@ -53,6 +70,66 @@ class Listing(models.Model):
         on_delete=models.CASCADE,
         related_name="listings"
     )
+    # Bid statistics, maintained by auctions.bidding.place_bid in the same
+    # transaction as each bid and rebuilt by the rebuild_bid_stats command.
+    bid_count = models.PositiveIntegerField(default=0)
+    leading_bid = models.ForeignKey(
+        "Bid",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+"
+    )
+    last_bid_at = models.DateTimeField(blank=True, null=True)
+    # Deadline after which the auction is closed by the batch closer.
+    ends_at = models.DateTimeField(blank=True, null=True)
+    # Bumped whenever the listing page changes (bid, comment, close, watch):
+    # the source of the page's ETag.
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+    # When the auction closed; unlike updated_at, later comments and watch
+    # changes leave it alone. Bids are archived some days after it.
+    closed_at = models.DateTimeField(blank=True, null=True)
+    # Set once the listing's bids were moved to ArchivedBid (auctions.archive).
+    bids_archived = models.BooleanField(default=False)
+
+    objects = ListingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the active feed: WHERE active ORDER BY id DESC.
+            models.Index(
+                fields=["id"],
+                condition=models.Q(active=True),
+                name="listing_active_idx",
+            ),
+            # Category feed: WHERE category_id = ? AND active ORDER BY id DESC.
+            models.Index(
+                fields=["category", "id"],
+                condition=models.Q(active=True),
+                name="listing_active_category_idx",
+            ),
+            # Batch closer: WHERE active AND ends_at <= now.
+            models.Index(
+                fields=["ends_at"],
+                condition=models.Q(active=True),
+                name="listing_active_ends_at_idx",
+            ),
+            # Bid archiver: closed listings not archived yet, by closing time.
+            models.Index(
+                fields=["closed_at"],
+                condition=models.Q(active=False, bids_archived=False),
+                name="listing_closed_unarchived_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            self.version += 1
+            self.updated_at = timezone.now()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version", "updated_at"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return str(self.title)
@@ -70,10 +147,57 @@ class Bid(models.Model):
         on_delete=models.CASCADE,
         related_name="bids"
     )
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Highest bid of a listing: WHERE listing_id = ? ORDER BY amount DESC.
+            models.Index(fields=["listing", "-amount"], name="bid_listing_amount_idx"),
+        ]
 
     def __str__(self):
         return f"{self.amount} by {self.bidder.username} on {self.listing.title}"
 
+class ArchivedBid(models.Model):
+    """A bid of a closed listing, moved out of the Bid table with its original id."""
+    id = models.IntegerField(primary_key=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    bidder = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    listing = models.ForeignKey(Listing, related_name="archived_bids", on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Exports of a period: WHERE timestamp >= ? AND timestamp < ?.
+            models.Index(fields=["timestamp"], name="archivedbid_timestamp_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.amount} on listing {self.listing_id} (archived)"
+
+class ProxyBid(models.Model):
+    """A user's maximum for automatic bidding on a listing (see auctions.bidding)."""
+    user = models.ForeignKey(User, related_name="proxy_bids", on_delete=models.CASCADE)
+    listing = models.ForeignKey(Listing, related_name="proxy_bids", on_delete=models.CASCADE)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # When the maximum was set: the earlier of two equal maxima wins.
+    placed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "user"], name="proxybid_listing_user_uniq"),
+        ]
+        indexes = [
+            # Two highest maxima of a listing: ORDER BY max_amount DESC, placed_at LIMIT 2.
+            models.Index(
+                fields=["listing", "-max_amount", "placed_at"], name="proxybid_ladder_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Up to {self.max_amount} by user {self.user_id} on listing {self.listing_id}"
+
 class Comment(models.Model):
     """Represents a comment made on a listing."""
     content = models.TextField()
@@ -93,12 +217,69 @@ class Comment(models.Model):
 
 class Notification(models.Model):
     """Represents a notification for a user."""
+    # Kinds of notification that the retention job may summarize.
+    OFFER = "offer"
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
     message = models.TextField()
+    kind = models.CharField(max_length=20, blank=True, default="")
+    # Number of events summarized by this row (see auctions.retention).
+    count = models.PositiveIntegerField(default=1)
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Notification feed: WHERE user_id = ? ORDER BY timestamp DESC.
+            models.Index(fields=["user", "-timestamp"], name="notification_user_ts_idx"),
+            # Unread notifications: WHERE user_id = ? AND NOT read ORDER BY timestamp DESC.
+            models.Index(
+                fields=["user", "-timestamp"],
+                condition=models.Q(read=False),
+                name="notification_unread_idx",
+            ),
+            # Retention: WHERE read AND timestamp < cutoff ORDER BY timestamp.
+            models.Index(
+                fields=["timestamp"],
+                condition=models.Q(read=True),
+                name="notification_read_ts_idx",
+            ),
+            # Compaction: offers grouped by user and listing.
+            models.Index(
+                fields=["user", "listing"],
+                condition=models.Q(kind="offer"),
+                name="notification_offer_idx",
+            ),
+        ]
+
     def __str__(self):
         return str(self.message)
-    
\ No newline at end of file
+    
+
+
+class Job(models.Model):
+    """A unit of background work waiting in the delivery queue (see auctions.jobs)."""
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    # Earliest time the job may run; pushed forward while a worker holds it
+    # and when a failed attempt is retried.
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    locked_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    failed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Due jobs: WHERE NOT failed AND run_at <= now ORDER BY run_at.
+            models.Index(
+                fields=["run_at"],
+                condition=models.Q(failed=False),
+                name="job_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
@@ -0,0 +1,186 @@
+"""
+Unread notification counters, bulk delivery and bulk read marking.
+
+Every user's number of unread notifications is kept in the cache so the
+layout can show it without a query. A missing counter is recounted from
+the database (one indexed COUNT) and cached again. Counters are adjusted
+only after the transaction that created or read the notifications commits,
+and a counter that drifts below zero is dropped and recounted. Counters
+are created by web requests and adjusted by the job worker and the
+auction closer, which run in other processes, so the alias must name a
+cache shared between processes; counters also expire after
+COUNT_TIMEOUT seconds, which bounds any drift.
+
+Notifications for the watchers of a listing are fanned out by a background
+job (see auctions.jobs), so a popular listing does not slow down bidding.
+A watcher who still has the same unread notification about the listing
+gets it replaced by the new one instead of a duplicate.
+
+The cache alias is taken from ``settings.NOTIFICATION_COUNT_CACHE``.
+
+Functions:
+- unread_count: Return a user's number of unread notifications.
+- count_created: Add newly created notifications to their users' counters.
+- count_removed: Take deleted unread notifications off their users' counters.
+- create_notifications: Insert and publish many notifications at once.
+- notify_watchers: Queue notifications for every watcher of some listings.
+- mark_read: Mark some or all of a user's notifications read with one UPDATE.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .events import publish, user_channel
+from .jobs import enqueue_many, handler
+from .models import Listing, Notification
+
+# Watchers notified per bulk_create by the fan-out job.
+FANOUT_BATCH_SIZE = 500
+
+# Seconds an unread counter is kept before it is recounted.
+COUNT_TIMEOUT = 300
+
+
+def count_cache():
+    """Return the cache that stores unread counters."""
+    return caches[getattr(settings, "NOTIFICATION_COUNT_CACHE", "default")]
+
+
+def _count_key(user_id):
+    return f"unread_notifications:{user_id}"
+
+
+def unread_count(user_id):
+    """Return the number of unread notifications of ``user_id``."""
+    cache = count_cache()
+    count = cache.get(_count_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read=False).count()
+        cache.add(_count_key(user_id), count, timeout=COUNT_TIMEOUT)
+    return count
+
+
+def _adjust(user_id, delta):
+    cache = count_cache()
+    try:
+        if cache.incr(_count_key(user_id), delta) < 0:
+            cache.delete(_count_key(user_id))
+    except ValueError:
+        # No counter cached: the next unread_count() recounts.
+        pass
+
+
+def count_created(user_ids, using=None):
+    """Count one new unread notification per entry of ``user_ids`` on commit."""
+    created = Counter(user_ids)
+    transaction.on_commit(
+        lambda: [_adjust(user_id, delta) for user_id, delta in created.items()],
+        using=using,
+    )
+
+
+def count_removed(removed, using=None):
+    """Subtract ``{user_id: n}`` deleted unread notifications on commit."""
+    removed = dict(removed)
+    transaction.on_commit(
+        lambda: [_adjust(user_id, -n) for user_id, n in removed.items()],
+        using=using,
+    )
+
+
+def create_notifications(notifications):
+    """
+    Insert ``notifications`` with bulk_create, count and publish them.
+
+    bulk_create does not send post_save, so this does what the signal
+    handlers do for single notifications.
+    """
+    Notification.objects.bulk_create(notifications)
+    count_created(notification.user_id for notification in notifications)
+    for notification in notifications:
+        publish(user_channel(notification.user_id), "notification", {
+            "id": notification.id,
+            "message": notification.message,
+            "listing": notification.listing_id,
+        })
+
+
+def notify_watchers(notices, kind=""):
+    """
+    Queue one fan-out job per ``(listing_id, message, exclude)`` notice.
+
+    Every watcher of the listing except the user ids in ``exclude`` gets
+    ``message`` as a notification of ``kind``. All jobs are inserted with
+    one query.
+    """
+    enqueue_many("notify_watchers", [
+        {
+            "listing": listing_id,
+            "message": message,
+            "kind": kind,
+            "exclude": [user_id for user_id in exclude if user_id is not None],
+        }
+        for listing_id, message, exclude in notices
+    ])
+
+
+@handler("notify_watchers", collapse=lambda payload: (payload["listing"], payload["message"]))
+def fan_out(payload):
+    """Deliver a notify_watchers job in batches of FANOUT_BATCH_SIZE watchers."""
+    listing_id, message = payload["listing"], payload["message"]
+    watcher_ids = list(
+        Listing.watchers.through.objects
+        .filter(listing_id=listing_id)
+        .exclude(user_id__in=payload["exclude"])
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+    )
+    for start in range(0, len(watcher_ids), FANOUT_BATCH_SIZE):
+        batch = watcher_ids[start:start + FANOUT_BATCH_SIZE]
+        duplicates = Notification.objects.filter(
+            user_id__in=batch, listing_id=listing_id, message=message, read=False
+        )
+        collapsed = set(duplicates.values_list("user_id", flat=True))
+        duplicates.delete()
+        notifications = Notification.objects.bulk_create(
+            Notification(
+                user_id=user_id,
+                message=message,
+                kind=payload.get("kind", ""),
+                listing_id=listing_id
+            )
+            for user_id in batch
+        )
+        # Collapsed notifications replace unread ones: counters and open
+        # badges only change for the rest.
+        fresh = [
+            notification for notification in notifications
+            if notification.user_id not in collapsed
+        ]
+        count_created(notification.user_id for notification in fresh)
+        for notification in fresh:
+            publish(user_channel(notification.user_id), "notification", {
+                "id": notification.id,
+                "message": message,
+                "listing": listing_id,
+            })
+
+
+def mark_read(user, ids=None):
+    """
+    Mark the unread notifications of ``user`` read; only ``ids`` if given.
+
+    Notifications of other users are left alone. Returns how many were
+    marked read.
+    """
+    queryset = Notification.objects.filter(user=user, read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    with transaction.atomic():
+        updated = queryset.update(read=True)
+        if updated:
+            transaction.on_commit(lambda: _adjust(user.id, -updated))
+    return updated
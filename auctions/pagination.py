@@ -0,0 +1,131 @@
+"""
+Keyset (cursor) pagination for listing feeds.
+
+Pages are ordered newest first by primary key and fetched with
+``WHERE id < :cursor ORDER BY id DESC LIMIT n``, so every page costs the
+same index range scan no matter how deep it is, and no COUNT(*) is run.
+Cursors are opaque tokens that encode the direction and the boundary key.
+
+Classes:
+- CursorPage: One page of results plus its next/previous cursors.
+
+Functions:
+- paginate: Fetch the page of a queryset addressed by a cursor.
+- apaginate: The same, for async views.
+- paginate_values: The same for a ``.values()`` queryset of dicts.
+- page_keys: Fetch only some columns of the rows of that page.
+"""
+
+import base64
+import binascii
+from operator import attrgetter, itemgetter
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def encode_cursor(direction, key):
+    """Return an opaque token for paginating ``direction`` from ``key``."""
+    raw = f"{direction}:{key}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return ``(direction, key)`` for a token, or ``None`` if it is invalid."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, key = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        key = int(key)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS):
+        return None
+    return direction, key
+
+
+class CursorPage:
+    """A page of objects with the cursors needed to move around it."""
+
+    def __init__(self, object_list, has_next, has_previous, key=attrgetter("pk")):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = (
+            encode_cursor(NEXT, key(object_list[-1])) if has_next and object_list else None
+        )
+        self.previous_cursor = (
+            encode_cursor(PREVIOUS, key(object_list[0])) if has_previous and object_list else None
+        )
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+def _page_query(queryset, cursor, per_page):
+    """Return the sliced queryset of the page at ``cursor`` and its direction."""
+    position = decode_cursor(cursor)
+    if position is None:
+        return queryset.order_by("-pk")[:per_page + 1], None
+    direction, key = position
+    if direction == NEXT:
+        return queryset.filter(pk__lt=key).order_by("-pk")[:per_page + 1], NEXT
+    return queryset.filter(pk__gt=key).order_by("pk")[:per_page + 1], PREVIOUS
+
+
+def _page_rows(rows, direction, per_page):
+    """Return ``(rows, has_next, has_previous)`` from the fetched rows."""
+    if direction != PREVIOUS:
+        return rows[:per_page], len(rows) > per_page, direction == NEXT
+    has_previous = len(rows) > per_page
+    rows = rows[:per_page]
+    rows.reverse()
+    return rows, True, has_previous
+
+
+def _fetch(queryset, cursor, per_page):
+    """Return ``(rows, has_next, has_previous)`` of the page at ``cursor``."""
+    query, direction = _page_query(queryset, cursor, per_page)
+    return _page_rows(list(query), direction, per_page)
+
+
+def paginate(queryset, cursor=None, per_page=10):
+    """
+    Return the CursorPage of ``queryset`` addressed by ``cursor``.
+
+    An invalid or missing cursor yields the first page.
+    """
+    return CursorPage(*_fetch(queryset, cursor, per_page))
+
+
+async def apaginate(queryset, cursor=None, per_page=10):
+    """Async paginate(), fetching the page with the async ORM."""
+    query, direction = _page_query(queryset, cursor, per_page)
+    rows = [row async for row in query]
+    return CursorPage(*_page_rows(rows, direction, per_page))
+
+
+def paginate_values(queryset, cursor=None, per_page=10):
+    """
+    Return the CursorPage of a ``.values()`` queryset addressed by ``cursor``.
+
+    The rows are dicts and must include ``id``.
+    """
+    return CursorPage(*_fetch(queryset, cursor, per_page), key=itemgetter("id"))
+
+
+def page_keys(queryset, cursor=None, per_page=10, fields=()):
+    """
+    Return ``(pk, *fields)`` tuples of the rows paginate() would return.
+
+    Used to fingerprint a page without loading it.
+    """
+    rows, has_next, _ = _fetch(queryset.values_list("pk", *fields), cursor, per_page)
+    return rows, has_next
@@ -0,0 +1,128 @@
+"""
+Notification retention: pruning, archival and compaction.
+
+Read notifications older than the retention period are deleted in batches
+of ``batch_size`` rows, one short transaction per batch, so on SQLite the
+write lock is released between batches and requests keep writing while a
+large backlog is pruned. Each batch can first be appended to an archive
+file as JSON lines; a batch whose delete fails is archived again by the
+next run.
+
+Bursts of offer notifications ("A new offer has been made in: X") are
+compacted into one row per user, listing and read state, whose ``count``
+says how many offers it stands for.
+
+The retention period is ``settings.NOTIFICATION_RETENTION_DAYS``.
+
+Functions:
+- retention_cutoff: Return the timestamp before which read notifications expire.
+- prune_notifications: Delete (and optionally archive) expired notifications.
+- compact_offer_notifications: Summarize repeated offer notifications.
+"""
+
+import json
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .models import Notification
+from .notifications import count_removed
+
+ARCHIVE_FIELDS = ("id", "user_id", "listing_id", "kind", "count", "message", "timestamp")
+
+
+def retention_cutoff(days=None, now=None):
+    """Return the time before which read notifications are pruned."""
+    if days is None:
+        days = getattr(settings, "NOTIFICATION_RETENTION_DAYS", 30)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def prune_notifications(older_than, batch_size=1000, archive=None, pause=0):
+    """
+    Delete read notifications with a timestamp before ``older_than``.
+
+    ``archive`` is an optional text file that receives every deleted row as
+    a JSON line. ``pause`` seconds are slept between batches to leave room
+    for other writers. Returns the number of rows deleted.
+    """
+    expired = Notification.objects.filter(
+        read=True, timestamp__lt=older_than
+    ).order_by("timestamp")
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            if archive is None:
+                ids = list(expired.values_list("id", flat=True)[:batch_size])
+            else:
+                rows = list(expired.values(*ARCHIVE_FIELDS)[:batch_size])
+                ids = [row["id"] for row in rows]
+                archive.writelines(
+                    json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows
+                )
+            if ids:
+                Notification.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def offer_summary(count, title):
+    return f"{count} new offers have been made in: {title}"
+
+
+def compact_offer_notifications(batch_size=1000):
+    """
+    Collapse offer notifications to one row per user, listing and read state.
+
+    The newest row of every group is kept with the group's total ``count``
+    and a summarized message; the older rows are deleted. Users are
+    processed ``batch_size`` at a time, one transaction per batch. Returns
+    the number of rows deleted.
+    """
+    offers = Notification.objects.filter(kind=Notification.OFFER)
+    deleted = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            offers.filter(user_id__gt=last_user_id)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not user_ids:
+            return deleted
+        last_user_id = user_ids[-1]
+
+        with transaction.atomic():
+            groups = (
+                offers.filter(user_id__in=user_ids)
+                .values("user_id", "listing_id", "read", "listing__title")
+                .annotate(rows=Count("id"), total=Sum("count"), newest=Max("id"))
+                .filter(rows__gt=1)
+                .order_by()
+            )
+            removed = Counter()
+            for group in groups:
+                rows, _ = offers.filter(
+                    user_id=group["user_id"],
+                    listing_id=group["listing_id"],
+                    read=group["read"],
+                    id__lt=group["newest"],
+                ).delete()
+                Notification.objects.filter(id=group["newest"]).update(
+                    count=group["total"],
+                    message=offer_summary(group["total"], group["listing__title"]),
+                )
+                deleted += rows
+                if not group["read"]:
+                    removed[group["user_id"]] += rows
+            count_removed(removed)
@@ -0,0 +1,144 @@
+"""
+Read-replica routing.
+
+``settings.DATABASE_REPLICAS`` lists database aliases that hold copies of
+``default``. Browse requests (GET and HEAD) read from a random replica;
+everything else, including management commands, background workers and
+every write, uses ``default``.
+
+Replicas lag behind the primary, so a user who has just written is pinned
+to the primary for ``settings.REPLICA_STICKY_SECONDS`` through a cookie:
+after bidding they always see their own bid. Views that write on GET, or
+that must read what they are about to write, are wrapped in
+``use_primary``. Sessions and users are always read from the primary: a
+replica refreshed before a login would not know the new session or user,
+and would log the user out.
+
+Classes:
+- ReplicaRouter: Database router sending reads to replicas when allowed.
+
+Functions:
+- replica_middleware: Allow replica reads for the duration of browse requests.
+- use_primary: Decorator pinning a view to the primary and marking it a write.
+- refresh_replica: Copy the primary SQLite database into a replica file.
+"""
+
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+STICKY_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD")
+
+# Apps whose models are never read from a replica, besides the user model.
+PRIMARY_APPS = ("sessions",)
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def sticky_seconds():
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+
+
+class ReplicaRouter:
+    """Send reads to a replica while the current request allows it."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS or model._meta.label == settings.AUTH_USER_MODEL:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        if aliases and _replica_reads.get():
+            return random.choice(aliases)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary and are never migrated directly.
+        return db not in replicas()
+
+
+def _is_sticky(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def _begin(request):
+    request.wrote_to_primary = request.method not in SAFE_METHODS
+    return _replica_reads.set(not request.wrote_to_primary and not _is_sticky(request))
+
+
+def _finish(request, response):
+    if request.wrote_to_primary and replicas():
+        seconds = sticky_seconds()
+        response.set_cookie(
+            STICKY_COOKIE, str(time.time() + seconds),
+            max_age=seconds, httponly=True, samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_middleware(get_response):
+    """Let browse requests read from replicas and make writers sticky."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _begin(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _replica_reads.reset(token)
+            return _finish(request, response)
+    else:
+        def middleware(request):
+            token = _begin(request)
+            try:
+                response = get_response(request)
+            finally:
+                _replica_reads.reset(token)
+            return _finish(request, response)
+    return middleware
+
+
+def use_primary(view):
+    """Run ``view`` against the primary and pin its user there afterwards."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.wrote_to_primary = True
+        token = _replica_reads.set(False)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def refresh_replica(alias):
+    """Copy the primary SQLite database into the replica ``alias``."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+    try:
+        primary.connection.backup(target)
+    finally:
+        target.close()
@@ -0,0 +1,162 @@
+"""
+Full-text listing search backed by SQLite FTS5.
+
+``auctions_listing_fts`` is an external-content FTS5 table over the title
+and description of auctions_listing. Triggers keep it in sync with every
+insert, delete and title/description update, including bulk_create() and
+queryset update() calls that bypass model signals. Results are ranked by
+BM25 with title matches weighted above description matches.
+
+On databases other than SQLite, search falls back to ``icontains``.
+
+Functions:
+- install_search_index: Create the FTS table and triggers if missing.
+- drop_search_index: Remove the FTS table and triggers.
+- rebuild_search_index: Re-index every listing from scratch.
+- search_listings: Return the best matching listings for a query.
+"""
+
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q
+
+from .models import Listing
+
+FTS_TABLE = "auctions_listing_fts"
+
+# Weights passed to bm25() for the title and description columns.
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title,
+        description,
+        content='auctions_listing',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+TRIGGERS = {
+    f"{FTS_TABLE}_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON auctions_listing BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+    f"{FTS_TABLE}_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON auctions_listing BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    f"{FTS_TABLE}_update": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, description
+        ON auctions_listing BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def supports_fts(connection=default_connection):
+    """Return True if ``connection`` can use the FTS5 index."""
+    return connection.vendor == "sqlite"
+
+
+def install_search_index(connection=default_connection):
+    """
+    Create the FTS table and its triggers if any of them is missing.
+
+    SQLite migrations that rebuild auctions_listing drop its triggers, so
+    this also runs after every migrate (see auctions.signals). The index
+    is rebuilt whenever something had to be created. Returns True if so.
+    """
+    if not supports_fts(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR name IN (%s, %s, %s)",
+            [FTS_TABLE, *TRIGGERS],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing >= {FTS_TABLE, *TRIGGERS}:
+            return False
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+    rebuild_search_index(connection)
+    return True
+
+
+def drop_search_index(connection=default_connection):
+    """Remove the FTS table and its triggers."""
+    if not supports_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def rebuild_search_index(connection=default_connection):
+    """Re-index every listing from the content table."""
+    if not supports_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(text):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators in user input are treated as
+    plain text; the last word matches as a prefix. Returns "" if the text
+    has no words.
+    """
+    words = TOKEN.findall(text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_listings(text, category_id=None, active=True, limit=30):
+    """Return up to ``limit`` listings matching ``text``, best first."""
+    expression = match_expression(text or "")
+    if not expression:
+        return []
+
+    if not supports_fts():
+        words = TOKEN.findall(text)
+        queryset = Listing.objects.filter(active=active)
+        if category_id is not None:
+            queryset = queryset.filter(category_id=category_id)
+        for word in words:
+            queryset = queryset.filter(Q(title__icontains=word) | Q(description__icontains=word))
+        return list(queryset.order_by("-pk")[:limit])
+
+    where = [f"{FTS_TABLE} MATCH %s", "auctions_listing.active = %s"]
+    params = [expression, active]
+    if category_id is not None:
+        where.append("auctions_listing.category_id = %s")
+        params.append(category_id)
+    params.append(limit)
+    sql = f"""
+        SELECT auctions_listing.*
+        FROM {FTS_TABLE}
+        JOIN auctions_listing ON auctions_listing.id = {FTS_TABLE}.rowid
+        WHERE {" AND ".join(where)}
+        ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})
+        LIMIT %s
+    """
+    return list(Listing.objects.raw(sql, params))
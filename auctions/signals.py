@@ -0,0 +1,131 @@
+"""
+Signal handlers for the auctions app, connected in AuctionsConfig.ready().
+
+- Saving or deleting a Listing or a Bid invalidates the listing's cached
+  card once the transaction commits.
+- Saving or deleting a Category invalidates the cached category catalog,
+  both right away and once the transaction commits.
+- Creating or deleting an active Listing adjusts its category's cached
+  count; any other Listing save drops the cached counts.
+- Changing watchers through ``Listing.watchers`` drops the affected users'
+  cached watch sets.
+- Creating a Notification publishes it to the user's live event stream and
+  counts it in the user's cached unread counter.
+- Saving or deleting a User drops its cached copy, both right away and
+  once the transaction commits.
+- Every migrate re-creates the listing search index triggers if a table
+  rebuild dropped them.
+- Every new SQLite connection is configured with settings.SQLITE_PRAGMAS.
+- Every new connection reports its queries to the request metrics.
+"""
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .auth import forget_users
+from .cards import bump_card_versions
+from .categories import adjust_counts, forget_counts, invalidate_catalog
+from .events import publish, user_channel
+from .metrics import instrument_connection
+from .models import User, Category, Listing, Bid, Notification
+from .notifications import count_created
+from .search import install_search_index
+from .watchlist import Watch, forget_watch_sets
+
+
+@receiver([post_save, post_delete], sender=Listing)
+def invalidate_listing_card(sender, instance, **kwargs):
+    """Bump the card version of a saved or deleted listing on commit."""
+    # Bumping earlier would let a concurrent reader cache the old row
+    # under the new version.
+    listing_id = instance.pk
+    transaction.on_commit(lambda: bump_card_versions([listing_id]), using=kwargs["using"])
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_catalog(sender, **kwargs):
+    """Reload the catalog now, and again once other processes can see the change."""
+    invalidate_catalog()
+    transaction.on_commit(invalidate_catalog, using=kwargs["using"])
+
+
+@receiver(post_save, sender=Listing)
+def count_saved_listing(sender, instance, created, **kwargs):
+    """Count a new active listing; recount after edits that may change it."""
+    if created:
+        if instance.active:
+            adjust_counts({instance.category_id: 1}, using=kwargs["using"])
+    else:
+        forget_counts()
+
+
+@receiver(post_delete, sender=Listing)
+def count_deleted_listing(sender, instance, **kwargs):
+    """Uncount a deleted active listing."""
+    if instance.active:
+        adjust_counts({instance.category_id: -1}, using=kwargs["using"])
+
+
+@receiver([post_save, post_delete], sender=Bid)
+def invalidate_bid_listing_card(sender, instance, **kwargs):
+    """Bump the card version of the listing a bid belongs to on commit."""
+    listing_id = instance.listing_id
+    transaction.on_commit(lambda: bump_card_versions([listing_id]), using=kwargs["using"])
+
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    """Push a new notification to the user's open event streams."""
+    if created:
+        count_created([instance.user_id], using=kwargs["using"])
+        publish(user_channel(instance.user_id), "notification", {
+            "id": instance.id,
+            "message": instance.message,
+            "listing": instance.listing_id,
+        }, using=kwargs["using"])
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached user now, and again once other processes can see the change."""
+    forget_users([instance.pk])
+    transaction.on_commit(lambda: forget_users([instance.pk]), using=kwargs["using"])
+
+
+@receiver(m2m_changed, sender=Watch)
+def invalidate_watch_sets(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Drop the cached watch sets of the users whose watchlist changed."""
+    if reverse:
+        # ``instance`` is the user, ``pk_set`` holds listing ids.
+        user_ids = [instance.pk]
+    elif action == "pre_clear":
+        instance._clearing_watchers = list(instance.watchers.values_list("id", flat=True))
+        return
+    elif action == "post_clear":
+        user_ids = getattr(instance, "_clearing_watchers", [])
+    else:
+        user_ids = list(pk_set or ())
+    if action.startswith("post_") and user_ids:
+        transaction.on_commit(lambda: forget_watch_sets(user_ids), using=using)
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Run the configured PRAGMA statements on a new SQLite connection."""
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def instrument_queries(sender, connection, **kwargs):
+    """Let the metrics middleware time the queries of a new connection."""
+    instrument_connection(connection)
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """Restore the listing search index after migrations (SQLite only)."""
+    install_search_index(connections[using])
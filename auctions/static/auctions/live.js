@@ -0,0 +1,63 @@
+// Live updates over Server-Sent Events.
+//
+// Elements opt in with data attributes:
+// - [data-listing-events]: URL of a listing stream; updates #current-price,
+//   #bid-count and the bid form when someone bids or the auction closes.
+// - [data-user-events]: URL of the user's stream; counts new notifications
+//   in #live-notifications, on top of the unread count rendered there.
+(function () {
+    "use strict";
+
+    function listen(url, handlers) {
+        var source = new EventSource(url);
+        Object.keys(handlers).forEach(function (event) {
+            source.addEventListener(event, function (message) {
+                handlers[event](JSON.parse(message.data));
+            });
+        });
+        return source;
+    }
+
+    function setText(id, text) {
+        var element = document.getElementById(id);
+        if (element) {
+            element.textContent = text;
+        }
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        var listing = document.querySelector("[data-listing-events]");
+        if (listing) {
+            listen(listing.dataset.listingEvents, {
+                bid: function (data) {
+                    var price = parseFloat(data.price);
+                    setText("current-price", data.price);
+                    setText("bid-count", data.bid_count);
+                    var input = document.getElementById("bid-input");
+                    if (input && parseFloat(input.value) <= price) {
+                        input.min = (price + 1).toFixed(2);
+                        input.value = input.min;
+                    }
+                },
+                closed: function () {
+                    var form = document.getElementById("bid-form");
+                    if (form) {
+                        form.remove();
+                    }
+                    setText("auction-status", "This auction has closed.");
+                }
+            });
+        }
+
+        var user = document.querySelector("[data-user-events]");
+        if (user) {
+            var unseen = parseInt(document.getElementById("live-notifications").textContent, 10) || 0;
+            listen(user.dataset.userEvents, {
+                notification: function () {
+                    unseen += 1;
+                    setText("live-notifications", unseen);
+                }
+            });
+        }
+    });
+})();
@@ -0,0 +1,21 @@
+"""
+Template tags for rendering cached listing cards.
+
+Usage::
+
+    {% load listing_cards %}
+    {% listing_cards page_obj "index" %}
+    {% listing_cards page_obj "index" watched_ids %}
+"""
+
+from django import template
+
+from auctions.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def listing_cards(listings, variant="index", watched=frozenset()):
+    """Render the cached cards of ``listings``, marking the ``watched`` ids."""
+    return render_cards(listings, variant, watched)
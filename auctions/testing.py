@@ -0,0 +1,85 @@
+"""
+Test helpers for the auctions app.
+
+Classes:
+- QueryBudgetMixin: TestCase mixin that pins the number of SQL queries a
+  view may run and checks that the number does not grow with row counts.
+- QueryPlanMixin: TestCase mixin that runs SQLite's EXPLAIN QUERY PLAN on
+  every query of a request and fails on full table scans.
+"""
+
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Assert per-view SQL query budgets.
+
+    A budget is the exact number of queries a request may run. Passing
+    ``grow`` adds more rows (comments, notifications, watchers, ...) and
+    replays the request, failing if the query count changed: the classic
+    symptom of an N+1 pattern.
+    """
+
+    query_budget_using = DEFAULT_DB_ALIAS
+
+    def capture_queries(self, method, url, **kwargs):
+        """Issue a request and return ``(response, captured_queries)``."""
+        with CaptureQueriesContext(connections[self.query_budget_using]) as context:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, context.captured_queries
+
+    def assertQueryBudget(self, budget, url, grow=None, method="get", **kwargs):
+        """Assert ``url`` runs exactly ``budget`` queries, before and after ``grow()``."""
+        response, queries = self.capture_queries(method, url, **kwargs)
+        self._check_budget(budget, url, queries)
+        if grow is not None:
+            grow()
+            response, queries = self.capture_queries(method, url, **kwargs)
+            self._check_budget(budget, url, queries, " after adding rows")
+        return response
+
+    def _check_budget(self, budget, url, queries, when=""):
+        if len(queries) != budget:
+            sql = "\n".join(
+                f"{i}. {query['sql']}" for i, query in enumerate(queries, start=1)
+            )
+            self.fail(
+                f"{url} ran {len(queries)} queries{when}, budget is {budget}:\n{sql}"
+            )
+
+
+class QueryPlanMixin(QueryBudgetMixin):
+    """
+    Assert that every query a request runs is answered through an index.
+
+    Only meaningful on SQLite, where ``EXPLAIN QUERY PLAN`` reports a full
+    table scan as a bare ``SCAN <table>`` line.
+    """
+
+    full_scan = re.compile(r"^SCAN (?:TABLE )?(\S+)$")
+
+    def query_plan(self, sql):
+        """Return the EXPLAIN QUERY PLAN detail lines of ``sql``."""
+        with connections[self.query_budget_using].cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndexes(self, url, allow=(), method="get", **kwargs):
+        """
+        Fail if any query issued by requesting ``url`` scans a whole table.
+
+        ``allow`` names small tables that are read in full on purpose.
+        """
+        response, queries = self.capture_queries(method, url, **kwargs)
+        for query in queries:
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+            for detail in self.query_plan(query["sql"]):
+                match = self.full_scan.match(detail)
+                if match and match.group(1) not in allow:
+                    self.fail(f"{url} scans a whole table ({detail}):\n{query['sql']}")
+        return response
@@ -1,3 +1,1440 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.management import call_command, CommandError
+from django.core.cache import caches
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import async_views, views
+from .archive import archive_bids, archive_cutoff
+from .auth import CachedUserBackend
+from .bidding import (
+    AuctionClosed, BidTooLow, InvalidAmount, place_bid, place_proxy_bid, resolve_proxies
+)
+from .cards import card_versions, render_cards
+from .categories import active_counts, catalog
+from .closing import close_expired_listings, close_listings
+from . import jobs
+from . import metrics
+from .events import format_event, hub, listing_channel, user_channel
+from .models import (
+    User, Category, Listing, ListingQuerySet, Bid, ArchivedBid, ProxyBid, Comment,
+    Notification, Job
+)
+from .notifications import mark_read, unread_count
+from .pagination import paginate
+from .retention import compact_offer_notifications, prune_notifications
+from .routers import STICKY_COOKIE, replica_middleware, use_primary
+from .search import search_listings
+from .testing import QueryBudgetMixin, QueryPlanMixin
+from .watchlist import is_watching, set_watching, watched_ids
+
+
+# The shared file cache is kept in process memory while testing, so test
+# runs neither read nor wipe the site's cache directory.
+_test_caches = override_settings(CACHES={
+    **settings.CACHES,
+    "files": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "auctions-tests-shared",
+    },
+})
+
+
+def setUpModule():
+    _test_caches.enable()
+
+
+def tearDownModule():
+    _test_caches.disable()
+
+
+def clear_caches():
+    """Clear every configured cache."""
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def make_listing(owner, category, price="10.00", **kwargs):
+    """Create an active listing owned by ``owner``."""
+    return Listing.objects.create(
+        title=kwargs.pop("title", "Laptop"),
+        description=kwargs.pop("description", "A laptop"),
+        starting_bid=Decimal(price),
+        current_price=Decimal(price),
+        image_url="https://example.com/laptop.jpg",
+        owner=owner,
+        category=category,
+        **kwargs
+    )
+
+
+class PlaceBidTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        self.listing = make_listing(self.owner, self.category)
+
+    def test_accepted_bid_updates_price_and_notifies_owner(self):
+        bid = place_bid(self.listing.id, self.bidder, "12.505")
+        self.listing.refresh_from_db()
+        self.assertEqual(bid.amount, Decimal("12.51"))
+        self.assertEqual(self.listing.current_price, Decimal("12.51"))
+        self.assertTrue(Notification.objects.filter(user=self.owner, listing=self.listing).exists())
+
+    def test_bid_must_exceed_current_price(self):
+        with self.assertRaises(BidTooLow):
+            place_bid(self.listing.id, self.bidder, "10.00")
+        self.assertFalse(Bid.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_closed_listing_rejects_bids(self):
+        Listing.objects.filter(id=self.listing.id).update(active=False)
+        with self.assertRaises(AuctionClosed):
+            place_bid(self.listing.id, self.bidder, "50")
+
+    def test_invalid_amounts(self):
+        for value in ("abc", "", None, "-5", "0", "NaN", "Infinity", "1e30", "123456789012"):
+            with self.subTest(value=value), self.assertRaises(InvalidAmount):
+                place_bid(self.listing.id, self.bidder, value)
+
+    def test_missing_listing(self):
+        with self.assertRaises(Listing.DoesNotExist):
+            place_bid(self.listing.id + 1, self.bidder, "50")
+
+    def test_bid_statistics_are_maintained(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        top = place_bid(self.listing.id, self.owner, "12")
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.bid_count, 2)
+        self.assertEqual(self.listing.leading_bid, top)
+        self.assertIsNotNone(self.listing.last_bid_at)
+
+    def test_rebuild_bid_stats(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        top = place_bid(self.listing.id, self.bidder, "12")
+        Listing.objects.filter(id=self.listing.id).update(
+            bid_count=0, leading_bid=None, last_bid_at=None
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_bid_stats", "--verify", stdout=StringIO())
+        call_command("rebuild_bid_stats", stdout=StringIO())
+        self.listing.refresh_from_db()
+        self.assertEqual(
+            (self.listing.bid_count, self.listing.leading_bid, self.listing.last_bid_at),
+            (2, top, top.timestamp)
+        )
+        call_command("rebuild_bid_stats", "--verify", stdout=StringIO())
+
+    def test_close_auction_uses_leading_bid(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        self.client.force_login(self.owner)
+        self.client.get(reverse("close_auction", args=[self.listing.id]))
+        self.listing.refresh_from_db()
+        self.assertFalse(self.listing.active)
+        self.assertEqual(self.listing.winner, self.bidder)
+        self.assertTrue(Notification.objects.filter(user=self.bidder).exists())
+
+    def test_add_bid_view(self):
+        self.client.force_login(self.bidder)
+        url = reverse("add_bid", args=[self.listing.id])
+        response = self.client.post(url, {"bid": "not a number"})
+        self.assertRedirects(response, reverse("view_listing", args=[self.listing.id]))
+        self.client.post(url, {"bid": "15.00"})
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, Decimal("15.00"))
+
+
+class ProxyBidTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username="owner")
+        cls.alice = User.objects.create(username="alice")
+        cls.bob = User.objects.create(username="bob")
+        cls.carol = User.objects.create(username="carol")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        self.listing = make_listing(self.owner, self.category)
+
+    def assertLeads(self, user, price):
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, Decimal(price))
+        self.assertEqual(self.listing.leading_bid.bidder, user)
+
+    def bids(self):
+        return [
+            (bid.bidder.username, str(bid.amount))
+            for bid in self.listing.bids.order_by("id").select_related("bidder")
+        ]
+
+    def test_proxies_settle_one_increment_above_the_runner_up(self):
+        place_proxy_bid(self.listing.id, self.alice, "50")
+        self.assertLeads(self.alice, "11.00")
+        place_proxy_bid(self.listing.id, self.bob, "30")
+        self.assertLeads(self.alice, "31.00")
+        place_proxy_bid(self.listing.id, self.bob, "60")
+        self.assertLeads(self.bob, "51.00")
+        self.assertEqual(self.bids(), [
+            ("alice", "11.00"), ("bob", "30.00"), ("alice", "31.00"),
+            ("alice", "50.00"), ("bob", "51.00"),
+        ])
+
+    def test_earlier_of_equal_maxima_wins(self):
+        place_proxy_bid(self.listing.id, self.alice, "50")
+        place_proxy_bid(self.listing.id, self.bob, "50")
+        self.assertLeads(self.alice, "50.00")
+
+    def test_fixed_bid_is_answered_by_proxy(self):
+        place_proxy_bid(self.listing.id, self.alice, "50")
+        bid = place_bid(self.listing.id, self.carol, "20")
+        self.assertEqual(bid.bidder, self.carol)
+        self.assertLeads(self.alice, "21.00")
+        place_bid(self.listing.id, self.carol, "60")
+        self.assertLeads(self.carol, "60.00")
+
+    def test_rejected_maxima(self):
+        place_proxy_bid(self.listing.id, self.alice, "50")
+        with self.assertRaises(BidTooLow):
+            place_proxy_bid(self.listing.id, self.bob, "11")
+        with self.assertRaises(BidTooLow):
+            place_proxy_bid(self.listing.id, self.alice, "40")
+        Listing.objects.filter(id=self.listing.id).update(active=False)
+        with self.assertRaises(AuctionClosed):
+            place_proxy_bid(self.listing.id, self.bob, "100")
+
+    def test_thousands_of_proxies_resolve_with_two_bids(self):
+        users = User.objects.bulk_create(User(username=f"proxy{i}") for i in range(2000))
+        maxima = [Decimal(20 + (i * 7919) % 5000) for i in range(len(users))]
+        ProxyBid.objects.bulk_create(
+            ProxyBid(user=user, listing=self.listing, max_amount=maximum)
+            for user, maximum in zip(users, maxima)
+        )
+        self.assertEqual(len(resolve_proxies(self.listing.id)), 2)
+        runner_up, best = sorted(maxima)[-2:]
+        self.assertLeads(users[maxima.index(best)], runner_up + 1)
+
+
+class ClosingTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pw")
+        self.bidder = User.objects.create_user("bidder", password="pw")
+        self.category = Category.objects.create(name="Electronics")
+        self.past = timezone.now() - timedelta(minutes=1)
+
+    def test_racing_closer_does_not_notify_twice(self):
+        first, second = [make_listing(self.owner, self.category) for _ in range(2)]
+        place_bid(first.id, self.bidder, "11")
+        touch = ListingQuerySet.touch
+
+        def closed_by_someone_else(queryset, **fields):
+            # The other closer commits between this closer's read and UPDATE.
+            Listing.objects.filter(id=first.id).update(active=False, closed_at=self.past)
+            return touch(queryset, **fields)
+
+        before = Notification.objects.filter(listing=first).count()
+        with mock.patch.object(ListingQuerySet, "touch", closed_by_someone_else):
+            closed = close_listings(Listing.objects.filter(id__in=[first.id, second.id]))
+        self.assertEqual(closed, 1)
+        self.assertEqual(Notification.objects.filter(listing=first).count(), before)
+        self.assertEqual(Notification.objects.filter(listing=second).count(), 1)
+
+    def test_closes_expired_listings_in_batches(self):
+        expired = [make_listing(self.owner, self.category) for _ in range(5)]
+        place_bid(expired[0].id, self.bidder, "11")
+        Listing.objects.filter(id__in=[listing.id for listing in expired]).update(ends_at=self.past)
+        future = make_listing(
+            self.owner, self.category, ends_at=timezone.now() + timedelta(days=1)
+        )
+        open_ended = make_listing(self.owner, self.category)
+
+        self.assertEqual(close_expired_listings(batch_size=2), 5)
+
+        self.assertEqual(Listing.objects.filter(active=False).count(), 5)
+        self.assertEqual(
+            Listing.objects.filter(id__in=[future.id, open_ended.id], active=True).count(), 2
+        )
+        expired[0].refresh_from_db()
+        self.assertEqual(expired[0].winner, self.bidder)
+        self.assertIsNotNone(expired[0].closed_at)
+        self.assertIsNone(Listing.objects.get(id=expired[1].id).winner)
+        self.assertTrue(Notification.objects.filter(
+            user=self.bidder, listing=expired[0], message__startswith="Congratulations"
+        ).exists())
+        self.assertEqual(
+            Notification.objects.filter(user=self.owner, message__startswith="Your auction").count(), 5
+        )
+        self.assertEqual(close_expired_listings(), 0)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        for _ in range(3):
+            make_listing(self.owner, self.category, ends_at=self.past)
+        with self.assertNumQueries(6):
+            close_expired_listings(now=timezone.now(), batch_size=100)
+
+        for _ in range(30):
+            make_listing(self.owner, self.category, ends_at=self.past)
+        with self.assertNumQueries(6):
+            close_expired_listings(now=timezone.now(), batch_size=100)
+
+    def test_bid_rejected_after_deadline(self):
+        listing = make_listing(self.owner, self.category, ends_at=self.past)
+        with self.assertRaises(AuctionClosed):
+            place_bid(listing.id, self.bidder, "11")
+        listing.refresh_from_db()
+        self.assertEqual(listing.bid_count, 0)
+
+    def test_command_reports_closed_count(self):
+        make_listing(self.owner, self.category, ends_at=self.past)
+        out = StringIO()
+        call_command("close_expired_auctions", stdout=out)
+        self.assertIn("Closed 1 expired auctions", out.getvalue())
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+        cls.listings = [make_listing(cls.owner, cls.category, title=f"L{i}") for i in range(25)]
+
+    def test_walk_forward_and_back(self):
+        queryset = Listing.objects.filter(active=True)
+        first = paginate(queryset, None, 10)
+        self.assertFalse(first.has_previous)
+        self.assertEqual([l.id for l in first], [l.id for l in reversed(self.listings)][:10])
+
+        second = paginate(queryset, first.next_cursor, 10)
+        third = paginate(queryset, second.next_cursor, 10)
+        self.assertEqual(len(third), 5)
+        self.assertFalse(third.has_next)
+
+        back = paginate(queryset, third.previous_cursor, 10)
+        self.assertEqual(back.object_list, second.object_list)
+        self.assertTrue(back.has_previous)
+        self.assertFalse(paginate(queryset, back.previous_cursor, 10).has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        queryset = Listing.objects.filter(active=True)
+        self.assertEqual(
+            paginate(queryset, "garbage!", 10).object_list,
+            paginate(queryset, None, 10).object_list
+        )
+
+    def test_index_runs_no_count_query(self):
+        # The ETag fingerprint of the page, then the page itself.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("index"))
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.viewer = User.objects.create_user("viewer", "viewer@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+        cls.listing = make_listing(cls.owner, cls.category)
+
+    def setUp(self):
+        clear_caches()
+        # Budgets are for a warm unread counter and user cache, and a
+        # cached session; add_rows keeps the counter warm.
+        unread_count(self.viewer.id)
+        self.client.force_login(self.viewer)
+        CachedUserBackend().get_user(self.viewer.id)
+        self.extra = 0
+
+    def add_rows(self, count=5):
+        """Add comments, watchers and notifications by new users."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add_rows(count)
+
+    def _add_rows(self, count):
+        for _ in range(count):
+            self.extra += 1
+            user = User.objects.create_user(f"extra{self.extra}")
+            Comment.objects.create(content="Nice", author=user, listing=self.listing)
+            self.listing.watchers.add(user)
+            listing = make_listing(user, self.category)
+            listing.watchers.add(self.viewer)
+            Notification.objects.create(user=self.viewer, message="Hi", listing=listing)
+
+    def test_view_listing(self):
+        self.add_rows(1)
+        self.assertQueryBudget(4, reverse("view_listing", args=[self.listing.id]), grow=self.add_rows)
+
+    def test_notifications_show(self):
+        self.add_rows(1)
+        self.assertQueryBudget(1, reverse("notifications_show"), grow=self.add_rows)
+
+    def test_display_watchlist(self):
+        self.add_rows(1)
+        self.assertQueryBudget(1, reverse("display_watchlist"), grow=self.add_rows)
+
+    def test_index(self):
+        self.add_rows(1)
+        # The watch set is recomputed: add_rows changes the viewer's watchlist.
+        self.assertQueryBudget(3, reverse("index"), grow=self.add_rows)
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+        cls.listings = [make_listing(cls.owner, cls.category) for _ in range(15)]
+        for listing in cls.listings[:5]:
+            listing.watchers.add(cls.owner)
+            Notification.objects.create(user=cls.owner, message="Hi", listing=listing)
+            place_bid(listing.id, cls.owner, "20")
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def test_index(self):
+        response = self.client.get(reverse("index"))
+        self.assertUsesIndexes(reverse("index") + "?cursor=" + response.context["page_obj"].next_cursor)
+
+    def test_display_category(self):
+        url = reverse("category_listings", args=[self.category.id])
+        self.assertUsesIndexes(url, allow=("auctions_category",))
+
+    def test_display_watchlist(self):
+        self.assertUsesIndexes(reverse("display_watchlist"))
+
+    def test_notifications_show(self):
+        self.assertUsesIndexes(reverse("notifications_show"))
+
+    def test_view_listing(self):
+        self.assertUsesIndexes(reverse("view_listing", args=[self.listings[0].id]))
+
+    def test_highest_bid_lookup(self):
+        queryset = Bid.objects.filter(listing=self.listings[0]).order_by("-amount")[:1]
+        self.assertIn("bid_listing_amount_idx", queryset.explain())
+
+    def test_unread_notifications_lookup(self):
+        queryset = Notification.objects.filter(user=self.owner, read=False).order_by("-timestamp")
+        self.assertIn("notification_unread_idx", queryset.explain())
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user", "user@example.com", "pw")
+        cls.other = User.objects.create_user("other", "other@example.com", "pw")
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(self.user)
+
+    def notify(self, user, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Notification.objects.create(user=user, message="Hi") for _ in range(count)]
+
+    def test_counter_is_cached_and_kept_up_to_date(self):
+        self.notify(self.user, 2)
+        self.assertEqual(unread_count(self.user.id), 2)
+        self.notify(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.user.id), 3)
+
+    def test_badge_shows_unread_count(self):
+        self.notify(self.user, 2)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, 'class="badge badge-light">2</span>')
+
+    def test_mark_read_ignores_other_users(self):
+        mine = self.notify(self.user)[0]
+        theirs = self.notify(self.other)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_read(self.user, [mine.id, theirs.id]), 1)
+        self.client.get(reverse("mark_read", args=[theirs.id]))
+        self.assertFalse(Notification.objects.get(id=theirs.id).read)
+        self.assertEqual(unread_count(self.user.id), 0)
+        self.assertEqual(unread_count(self.other.id), 1)
+
+    def test_mark_all_read_uses_one_update(self):
+        self.notify(self.user, 5)
+        unread_count(self.user.id)
+        with self.assertNumQueries(3):  # SAVEPOINT, UPDATE, RELEASE
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(mark_read(self.user), 5)
+        self.assertEqual(unread_count(self.user.id), 0)
+
+    def test_mark_read_endpoints(self):
+        notifications = self.notify(self.user, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("mark_read_many"),
+                {"ids": [notifications[0].id, notifications[1].id]},
+                HTTP_ACCEPT="application/json",
+            )
+        self.assertEqual(response.json(), {"updated": 2, "unread": 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("mark_all_read"))
+        self.assertRedirects(response, reverse("notifications_show"))
+        self.assertEqual(unread_count(self.user.id), 0)
+
+    def test_notifications_are_paginated(self):
+        self.notify(self.user, 35)
+        response = self.client.get(reverse("notifications_show"))
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), 30)
+        response = self.client.get(reverse("notifications_show") + "?cursor=" + page_obj.next_cursor)
+        self.assertEqual(len(response.context["page_obj"]), 5)
+
+
+class JobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.listing = make_listing(self.owner, self.category)
+        self.watchers = [
+            User.objects.create(username=f"watcher{i}") for i in range(3)
+        ]
+        self.listing.watchers.add(self.bidder, *self.watchers)
+
+    def test_bid_enqueues_one_job_regardless_of_watchers(self):
+        # The ninth query looks for proxy bids that should answer.
+        with self.assertNumQueries(9):
+            place_bid(self.listing.id, self.bidder, "11")
+        self.listing.watchers.add(*[
+            User.objects.create(username=f"more{i}") for i in range(20)
+        ])
+        with self.assertNumQueries(9):
+            place_bid(self.listing.id, self.watchers[0], "12")
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_watchers_are_notified_by_the_worker(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        self.assertFalse(Notification.objects.filter(user__in=self.watchers).exists())
+
+        self.assertEqual(jobs.run_pending(), (1, 0))
+
+        self.assertEqual(
+            Notification.objects.filter(user__in=self.watchers, listing=self.listing).count(), 3
+        )
+        self.assertFalse(Notification.objects.filter(user=self.bidder).exists())
+        self.assertEqual(Notification.objects.filter(user=self.owner).count(), 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_duplicate_events_collapse_per_user(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        jobs.run_pending()
+        place_bid(self.listing.id, self.watchers[0], "12")
+        place_bid(self.listing.id, self.bidder, "13")
+        self.assertEqual(jobs.run_pending(), (2, 0))
+
+        for watcher in self.watchers:
+            self.assertEqual(Notification.objects.filter(user=watcher, read=False).count(), 1)
+        # Only the newest job ran, and it skips the bidder who is leading again.
+        self.assertFalse(Notification.objects.filter(user=self.bidder).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(unread_count(self.watchers[1].id), 1)
+
+    def test_failed_jobs_are_retried_then_given_up(self):
+        calls = []
+
+        @jobs.handler("test_failure")
+        def fail(payload):
+            calls.append(payload)
+            raise RuntimeError("boom")
+
+        job = jobs.enqueue("test_failure", {"n": 1})
+        for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+            with self.assertLogs("auctions.jobs", "ERROR"):
+                self.assertEqual(jobs.run_pending(), (0, 1))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn("boom", job.last_error)
+            # Not due again until the backoff has passed.
+            self.assertEqual(jobs.run_pending(), (0, 0))
+            Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.assertTrue(job.failed)
+        self.assertEqual(len(calls), jobs.MAX_ATTEMPTS)
+        self.assertEqual(jobs.run_pending(), (0, 0))
+
+    def test_closing_notifies_watchers(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        jobs.run_pending()
+        Listing.objects.filter(id=self.listing.id).update(ends_at=timezone.now())
+        close_expired_listings()
+        out = StringIO()
+        call_command("run_jobs", "--once", stdout=out)
+        self.assertIn("Ran 1 jobs", out.getvalue())
+        self.assertEqual(Notification.objects.filter(
+            user__in=self.watchers, message__startswith="An auction you are watching"
+        ).count(), 3)
+        self.assertTrue(Notification.objects.filter(
+            user=self.bidder, message__startswith="Congratulations"
+        ).exists())
+
+
+class RetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.listing = make_listing(self.owner, self.category)
+        self.old = timezone.now() - timedelta(days=60)
+
+    def test_prunes_old_read_notifications_in_batches(self):
+        for read in (True, False):
+            for _ in range(5):
+                Notification.objects.create(user=self.owner, message="Old", read=read)
+        Notification.objects.update(timestamp=self.old)
+        recent = Notification.objects.create(user=self.owner, message="New", read=True)
+        archive = StringIO()
+
+        deleted = prune_notifications(
+            timezone.now() - timedelta(days=30), batch_size=2, archive=archive
+        )
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(Notification.objects.filter(read=False).count(), 5)
+        self.assertTrue(Notification.objects.filter(id=recent.id).exists())
+        lines = archive.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertIn('"message": "Old"', lines[0])
+
+    def test_compacts_offer_bursts_per_listing_and_user(self):
+        for amount in range(11, 16):
+            place_bid(self.listing.id, self.bidder, amount)
+        other = make_listing(self.owner, self.category, title="Phone")
+        place_bid(other.id, self.bidder, "11")
+        Notification.objects.create(user=self.owner, message="Welcome")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(unread_count(self.owner.id), 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(compact_offer_notifications(batch_size=1), 4)
+
+        summary = Notification.objects.get(user=self.owner, listing=self.listing)
+        self.assertEqual(summary.count, 5)
+        self.assertEqual(summary.message, "5 new offers have been made in: Laptop")
+        self.assertEqual(Notification.objects.get(user=self.owner, listing=other).count, 1)
+        self.assertEqual(unread_count(self.owner.id), 3)
+        self.assertEqual(compact_offer_notifications(), 0)
+
+    def test_command_reports_reclaimed_rows(self):
+        place_bid(self.listing.id, self.bidder, "11")
+        place_bid(self.listing.id, self.bidder, "12")
+        Notification.objects.create(user=self.bidder, message="Old", read=True)
+        Notification.objects.filter(user=self.bidder).update(timestamp=self.old)
+        out = StringIO()
+        call_command("prune_notifications", stdout=out)
+        self.assertIn("compacted: 1 notifications", out.getvalue())
+        self.assertIn("deleted: 1 notifications", out.getvalue())
+
+
+@skipUnless(connection.vendor == "sqlite", "PRAGMA settings are SQLite specific")
+class SQLitePragmaTests(TestCase):
+    def test_new_connections_get_configured_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS["busy_timeout"])
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def read_database(self, request, view=None, model=Listing):
+        """Return the alias a read of ``model`` in ``view`` would use, and the response."""
+        used = []
+
+        def browse(request):
+            used.append(model.objects.all().db)
+            return HttpResponse()
+
+        response = replica_middleware(view(browse) if view else browse)(request)
+        return used[0], response
+
+    def test_browse_requests_read_from_replicas(self):
+        database, response = self.read_database(self.factory.get("/"))
+        self.assertEqual(database, "replica")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_writes_use_primary_and_make_user_sticky(self):
+        database, response = self.read_database(self.factory.post("/"))
+        self.assertEqual(database, "default")
+        sticky = self.factory.get("/")
+        sticky.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        self.assertEqual(self.read_database(sticky)[0], "default")
+
+    def test_use_primary_views_write_on_get(self):
+        database, response = self.read_database(self.factory.get("/"), use_primary)
+        self.assertEqual(database, "default")
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_sessions_and_users_are_read_from_primary(self):
+        for model in (Session, User):
+            with self.subTest(model=model.__name__):
+                database, _ = self.read_database(self.factory.get("/"), model=model)
+                self.assertEqual(database, "default")
+
+    def test_expired_stickiness_reads_from_replicas(self):
+        request = self.factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = "0"
+        self.assertEqual(self.read_database(request)[0], "replica")
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(Listing.objects.all().db, "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        database, response = self.read_database(self.factory.post("/"))
+        self.assertEqual(database, "default")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class CategoryPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.computers = Category.objects.create(name="Computers")
+        cls.phones = Category.objects.create(name="Phones")
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listings = [make_listing(self.owner, self.computers) for _ in range(12)]
+            make_listing(self.owner, self.phones)
+            make_listing(self.owner, self.computers, active=False)
+
+    def test_picker_redirects_to_category_page(self):
+        response = self.client.get(reverse("display_category"), {"category": self.phones.id})
+        self.assertRedirects(response, reverse("category_listings", args=[self.phones.id]))
+
+    def test_category_page_paginates_active_listings(self):
+        url = reverse("category_listings", args=[self.computers.id])
+        page_obj = self.client.get(url).context["page_obj"]
+        self.assertEqual(len(page_obj), 10)
+        page_obj = self.client.get(url, {"cursor": page_obj.next_cursor}).context["page_obj"]
+        self.assertEqual(len(page_obj), 2)
+        self.assertTrue(all(listing.active for listing in page_obj))
+        self.assertEqual(self.client.get(reverse("category_listings", args=[999])).status_code, 404)
+
+    def test_counts_are_served_from_cache(self):
+        url = reverse("category_listings", args=[self.phones.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if "COUNT(" in query["sql"] and "auctions_listing" in query["sql"]
+        ])
+        counts = {
+            category["name"]: category["active_count"] for category in response.context["categories"]
+        }
+        self.assertEqual(counts, {"Computers": 12, "Phones": 1})
+
+    def test_counts_follow_create_and_close(self):
+        self.assertEqual(active_counts([self.computers.id]), {self.computers.id: 12})
+        with self.captureOnCommitCallbacks(execute=True):
+            make_listing(self.owner, self.computers)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("close_auction", args=[self.listings[0].id]))
+            self.client.get(reverse("close_auction", args=[self.listings[1].id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(active_counts([self.computers.id]), {self.computers.id: 11})
+
+
+class CategoryCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(self.owner)
+
+    def post_listing(self, **data):
+        return self.client.post(reverse("add_listing"), {
+            "title": "Laptop",
+            "description": "A laptop",
+            "starting_bid": "10.00",
+            "image_url": "https://example.com/laptop.jpg",
+            "category": self.category.id,
+            **data,
+        })
+
+    def test_creating_a_listing_reads_no_categories(self):
+        self.post_listing()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertRedirects(self.post_listing(), reverse("index"))
+        self.assertFalse([q for q in queries.captured_queries if "auctions_category" in q["sql"]])
+        self.assertEqual([q["sql"].split()[0] for q in queries.captured_queries].count("INSERT"), 1)
+        self.assertEqual(Listing.objects.filter(category=self.category).count(), 2)
+
+    def test_catalog_follows_category_changes(self):
+        self.assertEqual([entry.name for entry in catalog()], ["Computers"])
+        Category.objects.create(name="Books")
+        self.assertEqual([entry.name for entry in catalog()], ["Books", "Computers"])
+        self.category.name = "Laptops"
+        self.category.save()
+        self.assertEqual([entry.name for entry in catalog()], ["Books", "Laptops"])
+        with self.assertNumQueries(0):
+            catalog()
+
+    def test_unknown_category_is_rejected(self):
+        response = self.post_listing(category=999)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors["category"])
+        self.assertFalse(Listing.objects.exists())
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.listing = make_listing(self.owner, self.category)
+        self.client.force_login(self.bidder)
+        self.url = reverse("view_listing", args=[self.listing.id])
+
+    def revalidate(self, url):
+        # The first page view issues the CSRF cookie, which is part of the ETag.
+        self.client.get(url)
+        etag = self.client.get(url)["ETag"]
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_listing_is_not_rendered_again(self):
+        response = self.revalidate(self.url)
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, "auctions/view_listing.html")
+
+    def test_unchanged_index_is_not_rendered_again(self):
+        response = self.revalidate(reverse("index"))
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, "auctions/index.html")
+
+    def test_changes_produce_a_new_etag(self):
+        self.client.get(self.url)
+        etag = self.client.get(self.url)["ETag"]
+        changes = [
+            lambda: place_bid(self.listing.id, self.owner, "11"),
+            lambda: self.client.post(reverse("add_comment", args=[self.listing.id]), {"comment": "Hi"}),
+            lambda: self.client.get(reverse("add_watchlist", args=[self.listing.id])),
+        ]
+        for change in changes:
+            change()
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            etag = response["ETag"]
+
+    def test_etag_depends_on_viewer(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.listing = make_listing(self.owner, self.category, title="Async laptop")
+        Comment.objects.create(listing=self.listing, author=self.owner, content="Still boxed")
+        self.listing.watchers.add(self.bidder)
+
+    def request(self, path, user, factory=AsyncRequestFactory, **extra):
+        request = factory().get(path, **extra)
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return request
+
+    async def test_listing_page(self):
+        url = reverse("view_listing", args=[self.listing.id])
+        response = await async_views.view_listing(
+            self.request(url, self.bidder), str(self.listing.id)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Async laptop")
+        self.assertContains(response, "Still boxed")
+        self.assertContains(response, "Delete from watchlist")
+
+    async def test_missing_and_closed_listings(self):
+        with self.assertRaises(Http404):
+            await async_views.view_listing(self.request("/", self.bidder), "999999")
+        await Listing.objects.filter(id=self.listing.id).aupdate(active=False)
+        response = await async_views.view_listing(
+            self.request("/", self.bidder), str(self.listing.id)
+        )
+        self.assertRedirects(response, reverse("index"), fetch_redirect_response=False)
+
+    async def test_etags_match_the_sync_views(self):
+        url = reverse("view_listing", args=[self.listing.id])
+        etag = (await sync_to_async(views.view_listing)(
+            self.request(url, self.bidder, RequestFactory), str(self.listing.id)
+        ))["ETag"]
+        response = await async_views.view_listing(
+            self.request(url, self.bidder, headers={"If-None-Match": etag}), str(self.listing.id)
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_index_marks_watched_listings(self):
+        response = await async_views.index(self.request(reverse("index"), self.bidder))
+        self.assertContains(response, "Async laptop")
+        self.assertContains(response, "Watching")
+
+    async def test_pages_require_login(self):
+        for view in (async_views.notifications_show, async_views.display_watchlist,
+                     async_views.display_category):
+            response = await view(self.request("/", AnonymousUser()))
+            self.assertEqual(response.status_code, 302)
+
+    async def test_watchlist_notifications_and_categories(self):
+        await Notification.objects.acreate(
+            user=self.bidder, listing=self.listing, message="You were outbid"
+        )
+        pages = [
+            (async_views.display_watchlist, "Async laptop"),
+            (async_views.notifications_show, "You were outbid"),
+            (async_views.display_category, "Computers"),
+        ]
+        for view, text in pages:
+            self.assertContains(await view(self.request("/", self.bidder)), text)
+
+    async def test_category_listings(self):
+        response = await async_views.category_listings(
+            self.request("/", self.bidder), self.category.id
+        )
+        self.assertContains(response, "Async laptop")
+        with self.assertRaises(Http404):
+            await async_views.category_listings(self.request("/", self.bidder), 999999)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(self.bidder)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params).json()
+
+    def test_listings_are_paginated_with_sparse_fields(self):
+        listings = [make_listing(self.owner, self.category, title=f"L{i}") for i in range(3)]
+        page = self.get("api_listings", fields="title,category_name", limit=2)
+        self.assertEqual(page["results"], [
+            {"id": listings[2].id, "title": "L2", "category_name": "Computers"},
+            {"id": listings[1].id, "title": "L1", "category_name": "Computers"},
+        ])
+        page = self.get("api_listings", fields="title", limit=2, cursor=page["next"])
+        self.assertEqual(page["results"], [{"id": listings[0].id, "title": "L0"}])
+        self.assertIsNone(page["next"])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse("api_listings"), {"fields": "title,password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json()["error"])
+
+    def test_batch_keeps_requested_order_in_one_query(self):
+        first = make_listing(self.owner, self.category)
+        second = make_listing(self.owner, self.category)
+        url = reverse("api_listing_batch")
+        ids = f"{second.id},999,{first.id}"
+        self.client.get(url, {"ids": ids})
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {"ids": ids, "fields": "current_price"}).json()
+        self.assertEqual(
+            sum('"auctions_listing"' in query["sql"] for query in queries.captured_queries), 1
+        )
+        self.assertEqual(data["results"], [
+            {"id": second.id, "current_price": "10.00"},
+            {"id": first.id, "current_price": "10.00"},
+        ])
+        self.assertEqual(data["missing"], [999])
+
+    def test_bid_history_and_unknown_listing(self):
+        listing = make_listing(self.owner, self.category)
+        place_bid(listing.id, self.bidder, "11")
+        place_bid(listing.id, self.owner, "12")
+        history = self.get("api_listing_bids", listing.id)["results"]
+        self.assertEqual(
+            [(bid["amount"], bid["bidder_username"]) for bid in history],
+            [("12.00", "owner"), ("11.00", "bidder")],
+        )
+        response = self.client.get(reverse("api_listing_bids", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_bids_report_each_outcome(self):
+        listing = make_listing(self.owner, self.category)
+        closed = make_listing(self.owner, self.category, active=False)
+        bids = [
+            {"listing": listing.id, "amount": "15"},
+            {"listing": listing.id, "amount": "12"},
+            {"listing": closed.id, "amount": "50"},
+            {"listing": listing.id, "amount": "lots"},
+        ]
+        data = self.client.post(
+            reverse("api_bids"), {"bids": bids}, content_type="application/json"
+        ).json()
+        self.assertEqual(data["accepted"], 1)
+        self.assertEqual(
+            [result.get("error") for result in data["results"]],
+            [None, "bid_too_low", "auction_closed", "invalid_amount"],
+        )
+        listing.refresh_from_db()
+        self.assertEqual(listing.current_price, Decimal("15.00"))
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse("api_listings"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+
+class AuthCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("alice", "alice@example.com", "pw")
+
+    def setUp(self):
+        caches[settings.USER_CACHE].delete(f"user:{self.user.id}")
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query["sql"] for query in context.captured_queries
+            if 'FROM "auctions_user"' in query["sql"] or "django_session" in query["sql"]
+        ]
+
+    def test_logged_in_user_is_served_from_cache(self):
+        self.client.force_login(self.user)
+        url = reverse("notifications_show")
+        self.assertEqual(len(self.auth_queries(url)), 1)
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_saving_user_drops_cached_copy(self):
+        backend = CachedUserBackend()
+        backend.get_user(self.user.id)
+        self.user.first_name = "Alice"
+        self.user.save()
+        self.assertEqual(backend.get_user(self.user.id).first_name, "Alice")
+
+    def test_password_change_ends_cached_sessions(self):
+        self.client.force_login(self.user)
+        url = reverse("notifications_show")
+        self.client.get(url)
+        self.user.set_password("new password")
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookie_sessions(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            self.user.set_password("pw")
+            self.user.save()
+            self.client.post(reverse("login"), {"username": "alice", "password": "pw"})
+        url = reverse("notifications_show")
+        self.client.get(url)
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_hash_iterations_follow_setting(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.user.set_password("pw")
+            self.user.save()
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            self.assertTrue(make_password("pw").startswith("pbkdf2_sha256$1000$"))
+            self.assertTrue(self.user.check_password("pw"))
+        # check_password() re-hashed it with the configured count.
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username="staff", is_staff=True)
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.client.force_login(self.staff)
+
+    def test_sampled_request_reports_timings(self):
+        make_listing(self.staff, self.category)
+        response = self.client.get(reverse("index"))
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries')
+        stats = metrics.summary()["index"]
+        self.assertEqual(stats["samples"], 1)
+        self.assertGreater(stats["queries"]["p50"], 0)
+        self.assertGreater(stats["template_ms"]["p50"], 0)
+
+    def test_repeated_queries_are_counted_as_duplicates(self):
+        def view(request):
+            for _ in range(3):
+                list(Category.objects.filter(name="Computers"))
+            return HttpResponse()
+
+        metrics.metrics_middleware(view)(RequestFactory().get("/"))
+        self.assertEqual(metrics.summary()["<unresolved>"]["duplicates"]["p50"], 2)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        response = self.client.get(reverse("index"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(metrics.summary(), {})
+
+    def test_percentiles_over_the_window(self):
+        for wall in range(100, 0, -1):
+            metrics.record("view", dict.fromkeys(metrics.METRICS, 0) | {"wall_ms": wall})
+        self.assertEqual(
+            metrics.summary()["view"]["wall_ms"], {"p50": 50, "p95": 95, "p99": 99}
+        )
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get(reverse("index"))
+        data = self.client.get(reverse("metrics_stats")).json()
+        self.assertIn("index", data["views"])
+        self.client.force_login(User.objects.create(username="visitor"))
+        self.assertEqual(self.client.get(reverse("metrics_stats")).status_code, 403)
+
+
+class WatchlistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.viewer = User.objects.create_user("viewer", "viewer@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.listing = make_listing(self.owner, self.category)
+
+    def test_watching_is_idempotent_single_statements(self):
+        for watching in (True, True, False, False):
+            with self.assertNumQueries(1):
+                set_watching(self.viewer.id, self.listing.id, watching)
+            self.assertEqual(
+                self.listing.watchers.filter(id=self.viewer.id).count(), int(watching)
+            )
+
+    def test_membership_is_a_single_row_lookup(self):
+        set_watching(self.viewer.id, self.listing.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(is_watching(self.viewer.id, self.listing.id))
+        self.assertNotIn("auctions_user", queries.captured_queries[0]["sql"])
+        watched_ids(self.viewer.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_watching(self.viewer.id, self.listing.id))
+            self.assertFalse(is_watching(self.viewer.id, self.listing.id + 1))
+
+    def test_changes_drop_the_cached_set(self):
+        self.assertEqual(watched_ids(self.viewer.id), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            set_watching(self.viewer.id, self.listing.id)
+        self.assertEqual(watched_ids(self.viewer.id), {self.listing.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.viewer.watchlist.remove(self.listing)
+        self.assertEqual(watched_ids(self.viewer.id), frozenset())
+
+    def test_view_sets_the_requested_state(self):
+        self.client.force_login(self.viewer)
+        url = reverse("add_watchlist", args=[self.listing.id])
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(url, {"watch": "1"})
+            self.assertTrue(is_watching(self.viewer.id, self.listing.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(url)
+        self.assertFalse(is_watching(self.viewer.id, self.listing.id))
+        self.assertEqual(self.client.get(reverse("add_watchlist", args=[999])).status_code, 404)
+
+    def test_index_marks_watched_cards(self):
+        make_listing(self.owner, self.category)
+        set_watching(self.viewer.id, self.listing.id)
+        self.client.force_login(self.viewer)
+        self.assertContains(self.client.get(reverse("index")), "Watching", count=1)
+
+
+class BidArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.staff = User.objects.create(username="staff", is_staff=True)
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.old = make_listing(self.owner, self.category)
+        self.recent = make_listing(self.owner, self.category)
+        for listing in (self.old, self.recent):
+            place_bid(listing.id, self.bidder, "11")
+            place_bid(listing.id, self.bidder, "12")
+        Listing.objects.filter(id=self.old.id).update(
+            active=False, closed_at=timezone.now() - timedelta(days=40)
+        )
+        Listing.objects.filter(id=self.recent.id).update(active=False, closed_at=timezone.now())
+
+    def test_bids_of_long_closed_listings_are_moved(self):
+        bid_ids = set(self.old.bids.values_list("id", flat=True))
+        # A comment after closing touches the listing; it is still archived.
+        Listing.objects.filter(id=self.old.id).touch()
+        # One bid per transaction: a listing's bids span several batches.
+        self.assertEqual(archive_bids(archive_cutoff(30), batch_size=1), (1, 2))
+        self.assertFalse(self.old.bids.exists())
+        self.assertEqual(set(self.old.archived_bids.values_list("id", flat=True)), bid_ids)
+        self.assertEqual(self.recent.bids.count(), 2)
+        self.old.refresh_from_db()
+        self.assertEqual((self.old.bid_count, self.old.current_price), (2, Decimal("12.00")))
+        call_command("rebuild_bid_stats", "--verify", stdout=StringIO())
+        self.assertEqual(archive_bids(archive_cutoff(30)), (0, 0))
+
+    def test_api_history_reads_the_archive(self):
+        archive_bids(archive_cutoff(30))
+        self.client.force_login(self.bidder)
+        history = self.client.get(reverse("api_listing_bids", args=[self.old.id])).json()
+        self.assertEqual([bid["amount"] for bid in history["results"]], ["12.00", "11.00"])
+
+    def test_export_streams_live_and_archived_bids(self):
+        archive_bids(archive_cutoff(30))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("export_bids"))
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,listing_id,bidder_id,amount,timestamp,archived")
+        self.assertEqual(
+            [line.rsplit(",", 1)[1] for line in lines[1:]], ["False"] * 2 + ["True"] * 2
+        )
+
+        response = self.client.get(reverse("export_bids"), {
+            "format": "jsonl", "listing": self.recent.id, "since": "2000-01-01"
+        })
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual({row["listing_id"] for row in rows}, {self.recent.id})
+        self.assertEqual(len(rows), 2)
+
+    def test_export_is_staff_only(self):
+        self.client.force_login(self.bidder)
+        self.assertEqual(self.client.get(reverse("export_bids")).status_code, 403)
+
+
+class ListingCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.category = Category.objects.create(name="Computers")
+
+    def setUp(self):
+        clear_caches()
+        self.listing = make_listing(self.owner, self.category, title="Old title")
+
+    def test_cards_are_served_from_cache(self):
+        html = render_cards([self.listing], "index")
+        self.assertIn("Old title", html)
+        # A stale in-memory object proves the second render never re-ran the template.
+        self.listing.title = "Not rendered"
+        self.assertEqual(render_cards([self.listing], "index"), html)
+
+    def test_variants_are_cached_separately(self):
+        self.assertNotIn("Current Price", render_cards([self.listing], "index"))
+        self.assertIn("Current Price", render_cards([self.listing], "category"))
+
+    def test_listing_save_invalidates_card(self):
+        render_cards([self.listing], "index")
+        self.listing.title = "New title"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing.save()
+        self.assertIn("New title", render_cards([self.listing], "index"))
+
+    def test_card_version_is_bumped_on_commit(self):
+        versions = card_versions([self.listing.id])
+        with self.captureOnCommitCallbacks() as callbacks:
+            place_bid(self.listing.id, self.bidder, "20")
+        # Before commit, readers still see the old row and the old version.
+        self.assertEqual(card_versions([self.listing.id]), versions)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(card_versions([self.listing.id]), versions)
+
+    def test_bid_invalidates_card(self):
+        render_cards([self.listing], "index")
+        with self.captureOnCommitCallbacks(execute=True):
+            place_bid(self.listing.id, self.bidder, "20")
+        self.listing.refresh_from_db()
+        self.assertIn("<strong>Bids:</strong> 1", render_cards([self.listing], "index"))
+
+
+class SeedAuctionsTests(TestCase):
+    def seed(self, *args):
+        call_command(
+            "seed_auctions", "--users", "5", "--categories", "3", "--listings", "10",
+            "--bids", "40", "--comments", "7", *args, stdout=StringIO()
+        )
+
+    def test_seed_is_consistent_and_idempotent(self):
+        self.seed()
+        counts = (User.objects.count(), Listing.objects.count(), Bid.objects.count())
+        self.assertEqual(counts, (5, 10, 40))
+        self.assertEqual(Comment.objects.count(), 7)
+        call_command("rebuild_bid_stats", "--verify", stdout=StringIO())
+        for listing in Listing.objects.select_related("leading_bid"):
+            self.assertEqual(listing.current_price, listing.leading_bid.amount)
+
+        self.seed()
+        self.assertEqual((User.objects.count(), Listing.objects.count(), Bid.objects.count()), counts)
+
+    def test_append_mode(self):
+        self.seed()
+        self.seed("--append")
+        self.assertEqual((User.objects.count(), Listing.objects.count()), (10, 20))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.computers = Category.objects.create(name="Computers")
+        cls.music = Category.objects.create(name="Music")
+        cls.laptop = make_listing(cls.owner, cls.computers, title="Gaming laptop",
+                                  description="Fast machine")
+        cls.bag = make_listing(cls.owner, cls.computers, title="Backpack",
+                               description="Fits a laptop")
+        cls.guitar = make_listing(cls.owner, cls.music, title="Guitar",
+                                  description="Acoustic, sounds like a laptop fan")
+
+    def test_title_matches_rank_first(self):
+        results = search_listings("laptop")
+        self.assertEqual(results[0], self.laptop)
+        self.assertEqual(set(results), {self.laptop, self.bag, self.guitar})
+
+    def test_prefix_and_filters(self):
+        self.assertEqual(search_listings("gam"), [self.laptop])
+        self.assertEqual(set(search_listings("laptop", category_id=self.music.id)), {self.guitar})
+        Listing.objects.filter(id=self.bag.id).update(active=False)
+        self.assertNotIn(self.bag, search_listings("laptop"))
+
+    def test_index_follows_updates_and_deletes(self):
+        Listing.objects.filter(id=self.guitar.id).update(title="Violin")
+        self.assertEqual(search_listings("violin"), [self.guitar])
+        self.assertEqual(search_listings("guitar"), [])
+        self.guitar.delete()
+        self.assertEqual(search_listings("violin"), [])
+
+    def test_operators_are_escaped(self):
+        self.assertEqual(search_listings('laptop" OR NEAR('), [])
+        self.assertEqual(search_listings("***"), [])
+
+    def test_search_view(self):
+        response = self.client.get(reverse("search"), {"q": "guitar"})
+        self.assertContains(response, "Guitar")
+
+
+class LiveEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pw")
+        cls.listing = make_listing(cls.owner, Category.objects.create(name="Computers"))
+
+    async def test_publish_reaches_every_subscriber(self):
+        first, second = hub.subscribe("test"), hub.subscribe("test")
+        try:
+            hub.publish("test", "ping", {"n": 1})
+            expected = format_event("ping", {"n": 1})
+            self.assertEqual(await first.get(timeout=1), expected)
+            self.assertEqual(await second.get(timeout=1), expected)
+        finally:
+            first.close()
+            second.close()
+        self.assertEqual(hub.subscriber_count("test"), 0)
+
+    async def test_bid_streams_price_and_owner_notification(self):
+        listing_stream = hub.subscribe(listing_channel(self.listing.id))
+        owner_stream = hub.subscribe(user_channel(self.owner.id))
+
+        def bid():
+            with self.captureOnCommitCallbacks(execute=True):
+                place_bid(self.listing.id, self.bidder, "25")
+
+        try:
+            await sync_to_async(bid)()
+            message = await listing_stream.get(timeout=1)
+            self.assertTrue(message.startswith("event: bid\n"))
+            self.assertIn('"price":"25.00"', message)
+            self.assertIn("A new offer", await owner_stream.get(timeout=1))
+        finally:
+            listing_stream.close()
+            owner_stream.close()
+
+    def test_streams_require_login(self):
+        response = self.client.get(reverse("listing_events", args=[self.listing.id]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_streams_answer_no_content_under_wsgi(self):
+        self.client.force_login(self.bidder)
+        response = self.client.get(reverse("listing_events", args=[self.listing.id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(reverse("user_events")).status_code, 204)
+
+    def test_pages_link_streams_only_when_enabled(self):
+        self.client.force_login(self.bidder)
+        url = reverse("view_listing", args=[self.listing.id])
+        response = self.client.get(url)
+        self.assertNotContains(response, "live.js")
+        self.assertNotContains(response, "data-listing-events")
+        with override_settings(LIVE_EVENTS=True):
+            response = self.client.get(url)
+        self.assertContains(response, "live.js")
+        self.assertContains(response, "data-listing-events")
+        self.assertContains(response, "data-user-events")
@@ -16,31 +16,67 @@ optionally with an override, handled by `views.view_listing`
 - "add/bid/<listing_id>" : Add a bid to a listing, handled by `views.add_bid`
 - "close/auction/<listing_id>" : Close an auction for a listing, handled by `views.close_auction`
 - "notifications/show" : Show notifications, handled by `views.notifications_show`
+- "mark/read/<notification_id>" : Mark one notification read, handled by `views.mark_read`
+- "notifications/read" : Mark the POSTed notification ids read,
+handled by `views.mark_read_many`
+- "notifications/read/all" : Mark every notification read, handled by `views.mark_all_read`
 - "display/watchlist" : Display the user's watchlist, 
 handled by `views.display_watchlist`
 - "add/watchlist/<listing_id>" : Add a listing to the user's watchlist, 
 handled by `views.add_watchlist`
-- "display/category" : Display listings by category, handled by `views.display_category`
+- "display/category" : Pick a category, handled by `views.display_category`
+- "category/<category_id>" : Paginated active listings of a category,
+handled by `views.category_listings`
+- "search" : Full-text listing search, handled by `views.search`
+- "events/listing/<listing_id>" : Server-Sent Events stream of a listing,
+handled by `views.listing_events`
+- "events/user" : Server-Sent Events stream of the user's notifications,
+handled by `views.user_events`
+- "stats/metrics" : Per-view request timings (staff only), handled by `views.metrics_stats`
+- "export/bids" : Streamed CSV/JSONL bid history (staff only), handled by `views.export_bids`
+- "api/v1/..." : JSON API, handled by the views of `auctions.api`
+
+With ``settings.ASYNC_VIEWS`` set, the read-only pages (index, listing,
+notifications, watchlist, category picker and category listings) are served by the async
+views of `auctions.async_views` instead.
 """
 
+from django.conf import settings
 from django.urls import path, re_path
 
-from . import views
+from . import api, async_views, views
+
+pages = async_views if getattr(settings, "ASYNC_VIEWS", False) else views
 
 urlpatterns = [
-    path("", views.index, name="index"),
+    path("", pages.index, name="index"),
     path("login", views.login_view, name="login"),
     path("logout", views.logout_view, name="logout"),
     path("register", views.register, name="register"),
     path("add/listing", views.add_listing, name="add_listing"),
     re_path(r'^listing/(?P<listing_id>\d+)(?:/(?P<override>\w+))?$',
-     views.view_listing, name='view_listing'),
+     pages.view_listing, name='view_listing'),
     path("add/comment/<int:listing_id>", views.add_comment, name="add_comment"),
     path("add/bid/<int:listing_id>", views.add_bid, name="add_bid"),
     path("close/auction/<int:listing_id>", views.close_auction, name="close_auction"),
-    path("notifications/show", views.notifications_show, name="notifications_show"),
-    path("display/watchlist", views.display_watchlist, name="display_watchlist"),
+    path("notifications/show", pages.notifications_show, name="notifications_show"),
+    path("display/watchlist", pages.display_watchlist, name="display_watchlist"),
     path("add/watchlist/<int:listing_id>", views.add_watchlist, name="add_watchlist"),
-    path("display/category", views.display_category, name="display_category"),
+    path("display/category", pages.display_category, name="display_category"),
+    path("category/<int:category_id>", pages.category_listings, name="category_listings"),
     path("mark/read/<int:notification_id>", views.mark_read, name="mark_read"),
+    path("notifications/read", views.mark_read_many, name="mark_read_many"),
+    path("notifications/read/all", views.mark_all_read, name="mark_all_read"),
+    path("search", views.search, name="search"),
+    path("events/listing/<int:listing_id>", views.listing_events, name="listing_events"),
+    path("events/user", views.user_events, name="user_events"),
+    path("stats/metrics", views.metrics_stats, name="metrics_stats"),
+    path("export/bids", views.export_bids, name="export_bids"),
+    path("api/v1/listings", api.listings, name="api_listings"),
+    path("api/v1/listings/batch", api.listing_batch, name="api_listing_batch"),
+    path("api/v1/listings/<int:listing_id>", api.listing_detail, name="api_listing"),
+    path("api/v1/listings/<int:listing_id>/bids", api.listing_bids, name="api_listing_bids"),
+    path("api/v1/listings/<int:listing_id>/comments", api.listing_comments,
+         name="api_listing_comments"),
+    path("api/v1/bids", api.bulk_bids, name="api_bids"),
 ]
@@ -1,12 +1,36 @@
+from functools import partial
+
 from django.contrib.auth import authenticate, login, logout
-from django.db import IntegrityError
-from django.http import HttpResponseRedirect
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django import forms
 from django.contrib.auth.decorators import login_required
-from .models import User, Category, Listing, Bid, Comment, Notification
-from django.core.paginator import Paginator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from .models import User, Listing, Bid, Comment, Notification
+from .archive import bid_rows, csv_lines, jsonl_lines
+from .bidding import BidError, place_bid, place_proxy_bid
+from .categories import active_counts, catalog, catalog_entry
+from .closing import close_listing
+from .conditional import index_etag, listing_etag
+from .events import event_stream, listing_channel, user_channel
+from . import metrics, notifications
+from .pagination import paginate
+from .routers import use_primary
+from .search import search_listings
+from .watchlist import is_watching, set_watching, watched_ids
+
+LISTINGS_PER_PAGE = 10
+NOTIFICATIONS_PER_PAGE = 30
 
 
 class ListingForm(forms.Form):
@@ -19,6 +43,7 @@ class ListingForm(forms.Form):
     - starting_bid: The starting bid for the listing.
     - image_url: The URL of the image for the listing.
     - category: The category of the listing.
+    - ends_at: Optional deadline after which the auction closes automatically.
     """
     title = forms.CharField(
         label="Titulo",
@@ -67,12 +92,30 @@ class ListingForm(forms.Form):
         required=True,
         widget=forms.Select(attrs={'class': 'form-control'})
     )
+    ends_at = forms.DateTimeField(
+        label='Ends at',
+        required=False,
+        input_formats=['%Y-%m-%dT%H:%M'],
+        widget=forms.DateTimeInput(
+            format='%Y-%m-%dT%H:%M',
+            attrs={
+                'type': 'datetime-local',
+                'class': 'form-control'
+            }
+        )
+    )
 
     def __init__(self, *args, **kwargs):
-        """Initialize the form with category choices."""
+        """Initialize the form with category choices from the cached catalog."""
         super().__init__(*args, **kwargs)
-        categories = Category.objects.all().values_list('id', 'name')
-        self.fields['category'].choices = [("", "Select a category")] + list(categories)
+        self.fields['category'].choices = [("", "Select a category")] + catalog()
+
+    def clean_ends_at(self):
+        """Reject deadlines in the past."""
+        ends_at = self.cleaned_data['ends_at']
+        if ends_at is not None and ends_at <= timezone.now():
+            raise forms.ValidationError("The auction must end in the future.")
+        return ends_at
 
 
 class CommentForm(forms.Form):
@@ -93,16 +136,33 @@ class CommentForm(forms.Form):
     )
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=partial(index_etag, per_page=LISTINGS_PER_PAGE))
 def index(request):
     """Render the index page with active listings."""
     listings = Listing.objects.filter(active=True)
-    paginator = Paginator(listings, 10) 
-
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(listings, request.GET.get('cursor'), LISTINGS_PER_PAGE)
 
     return render(request, "auctions/index.html", {
-        "page_obj": page_obj
+        "page_obj": page_obj,
+        "watched_ids": (
+            watched_ids(request.user.id) if request.user.is_authenticated else frozenset()
+        )
+    })
+
+
+def search(request):
+    """Search active listings by keyword, optionally within one category."""
+    query = request.GET.get('q', '').strip()
+    category_id = request.GET.get('category', '')
+    category_id = int(category_id) if category_id.isdigit() else None
+    listings = search_listings(query, category_id=category_id) if query else []
+
+    return render(request, "auctions/search.html", {
+        "query": query,
+        "category_id": category_id,
+        "categories": catalog(),
+        "listings": listings
     })
 
 
@@ -157,6 +217,7 @@ def register(request):
 
 
 @login_required
+@use_primary
 def add_listing(request):
     """Handle adding a new listing."""
     if request.method == "GET":
@@ -173,24 +234,30 @@ def add_listing(request):
                 image_url=form.cleaned_data['image_url'],
                 owner=request.user,
                 current_price=form.cleaned_data['starting_bid'],
-                category=Category.objects.get(id=form.cleaned_data['category'])
+                category_id=int(form.cleaned_data['category']),
+                ends_at=form.cleaned_data['ends_at']
             )
             listing.save()
             return redirect('index')
+        return render(request, "auctions/create_listing.html", {
+            "form": form
+        })
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=listing_etag)
 def view_listing(request, listing_id, override=None):
     """View a specific listing."""
     if request.method == "GET":
-        listing = get_object_or_404(Listing, id=listing_id)
+        listing = get_object_or_404(Listing.objects.select_related('category'), id=listing_id)
 
         if not listing.active and not override:
             return redirect('index')
 
-        isowner = listing.owner == request.user
+        isowner = listing.owner_id == request.user.id
         min_bid = listing.current_price + 1
-        comments = Comment.objects.filter(listing_id=listing.id)
+        comments = Comment.objects.filter(listing_id=listing.id).select_related('author')
 
         return render(request, "auctions/view_listing.html", {
             "listing": listing,
@@ -199,11 +266,12 @@ def view_listing(request, listing_id, override=None):
             "comment_form": CommentForm(),
             "min_bid": min_bid,
             "override": override is not None,
-            "watching": request.user in listing.watchers.all()
+            "watching": is_watching(request.user.id, listing.id)
         })
 
 
 @login_required
+@use_primary
 def add_comment(request, listing_id):
     """Add a comment to a listing."""
     if request.method == "POST":
@@ -215,115 +283,239 @@ def add_comment(request, listing_id):
                 listing=get_object_or_404(Listing, id=listing_id),
             )
             comment.save()
+            Listing.objects.filter(id=listing_id).touch()
             return redirect('view_listing', listing_id=listing_id)
     else:
         form = CommentForm()
     return render(request, 'auctions/view_listing.html', {
         'form': form,
-        'listing': get_object_or_404(Listing, id=listing_id),
-        'comments': Comment.objects.filter(listing_id=listing_id)
+        'listing': get_object_or_404(Listing.objects.select_related('category'), id=listing_id),
+        'comments': Comment.objects.filter(listing_id=listing_id).select_related('author')
     })
 
 
 @login_required
+@use_primary
 def add_bid(request, listing_id):
-    """Add a bid to a listing."""
+    """Add a bid, or a maximum for automatic bidding (``max_bid``), to a listing."""
     if request.method == "POST":
-        listing = get_object_or_404(Listing, id=listing_id)
-        bid = float(request.POST['bid'])
-        if bid > listing.current_price:
-            listing.current_price = bid
-            listing.save()
-            new_bid = Bid(
-                amount=bid,
-                bidder=request.user,
-                listing=listing
-            )
-            new_bid.save()
-            Notification.objects.create(
-                user=listing.owner,
-                message=f"A new offer has been made in: {listing.title}",
-                listing=listing
-            )
-            return redirect('view_listing', listing_id=listing_id)
+        try:
+            if request.POST.get('max_bid'):
+                place_proxy_bid(listing_id, request.user, request.POST['max_bid'])
+            else:
+                place_bid(listing_id, request.user, request.POST.get('bid'))
+        except Listing.DoesNotExist:
+            raise Http404("No Listing matches the given query.")
+        except BidError:
+            pass
+    return redirect('view_listing', listing_id=listing_id)
 
 
 @login_required
+@use_primary
 def close_auction(request, listing_id):
     """Close an auction for a listing."""
-    listing_this = get_object_or_404(Listing, id=listing_id)
-    listing_this.active = False
-    highest_bid = Bid.objects.filter(listing=listing_this).order_by('-amount').first()
-    if highest_bid:
-        bid_winner = highest_bid.bidder
-        listing_this.winner = bid_winner
-        Notification.objects.create(
-            user=bid_winner,
-            message=f"Congratulations, you have won the auction for: {listing_this.title}",
-            listing=listing_this
-        )
-    else:
-        listing_this.winner = None
-    listing_this.save()
+    listing = get_object_or_404(Listing.objects.only('id'), id=listing_id)
+    close_listing(listing.id)
     return redirect('index')
 
 
 @login_required
 def notifications_show(request):
-    """Show notifications for the logged-in user."""
-    notifications_for_this_user = Notification.objects.filter(user=request.user)
+    """Show notifications for the logged-in user, newest first."""
+    notifications_for_this_user = (
+        Notification.objects
+        .filter(user=request.user)
+        .select_related('listing')
+    )
+    page_obj = paginate(
+        notifications_for_this_user, request.GET.get('cursor'), NOTIFICATIONS_PER_PAGE
+    )
     return render(request, 'auctions/notifications.html', {
-        'notifications': notifications_for_this_user
+        'notifications': page_obj,
+        'page_obj': page_obj
     })
 
 
 @login_required
 def display_watchlist(request):
     """Display the watchlist for the logged-in user."""
-    user_watchlist = Listing.objects.filter(watchers=request.user)
+    user_watchlist = Listing.objects.filter(watchers=request.user, active=True)
+    page_obj = paginate(user_watchlist, request.GET.get('cursor'), LISTINGS_PER_PAGE)
     return render(request, 'auctions/watchlist.html', {
-        "listings": user_watchlist
+        "listings": page_obj,
+        "page_obj": page_obj
     })
 
 
 @login_required
+@use_primary
 def add_watchlist(request, listing_id):
-    """Add or remove a listing from the watchlist."""
-    listing = get_object_or_404(Listing, id=listing_id)
-    if request.user in listing.watchers.all():
-        listing.watchers.remove(request.user)
-        return redirect('display_watchlist')
+    """
+    Add a listing to the watchlist (``watch=1``) or remove it (``watch=0``).
+
+    Without ``watch`` the listing's membership is toggled.
+    """
+    watch = request.POST.get('watch', request.GET.get('watch'))
+    if watch in ('0', '1'):
+        watching = watch == '1'
     else:
-        listing.watchers.add(request.user)
+        watching = not is_watching(request.user.id, listing_id)
+    with transaction.atomic():
+        if not Listing.objects.filter(id=listing_id).touch():
+            raise Http404("No Listing matches the given query.")
+        set_watching(request.user.id, listing_id, watching)
     return redirect('display_watchlist')
 
 
 @login_required
 def display_category(request):
-    """Display listings by category."""
-    categories = Category.objects.all()
-
-    if request.method == "POST":
-        category_id = request.POST['category']
-        category = get_object_or_404(Category, id=category_id)
-        listings = Listing.objects.filter(category=category)
-        return render(request, 'auctions/categories.html', {
-            'listings': listings,
-            'category': category,
-            'categories': categories,
-            'find_listing': True
-        })
+    """Display the categories, or redirect to the one that was picked."""
+    category_id = request.POST.get('category') or request.GET.get('category')
+    if category_id and category_id.isdigit():
+        return redirect('category_listings', category_id=int(category_id))
 
     return render(request, 'auctions/categories.html', {
-        'categories': categories,
+        'categories': categories_with_counts(),
         'find_listing': False
     })
 
 
 @login_required
+def category_listings(request, category_id):
+    """Display the active listings of a category, one page at a time."""
+    category = catalog_entry(category_id)
+    if category is None:
+        raise Http404("No such category.")
+    listings = Listing.objects.filter(category_id=category.id, active=True)
+    page_obj = paginate(listings, request.GET.get('cursor'), LISTINGS_PER_PAGE)
+    return render(request, 'auctions/categories.html', {
+        'listings': page_obj,
+        'page_obj': page_obj,
+        'category': category,
+        'categories': categories_with_counts(),
+        'find_listing': True
+    })
+
+
+def categories_with_counts():
+    """Return every category of the catalog with its cached ``active_count``."""
+    categories = catalog()
+    counts = active_counts([category.id for category in categories])
+    return [
+        {'id': category.id, 'name': category.name, 'active_count': counts[category.id]}
+        for category in categories
+    ]
+
+
+@login_required
+@use_primary
 def mark_read(request, notification_id):
-    """Mark a notification as read."""
-    notification = get_object_or_404(Notification, id=notification_id)
-    notification.read = True
-    notification.save()
-    return redirect('notifications_show')	
\ No newline at end of file
+    """Mark a notification of the logged-in user as read."""
+    notifications.mark_read(request.user, [notification_id])
+    return redirect('notifications_show')
+
+
+def _marked_read_response(request, updated):
+    if request.accepts('text/html'):
+        return redirect('notifications_show')
+    return JsonResponse({
+        'updated': updated,
+        'unread': notifications.unread_count(request.user.id)
+    })
+
+
+@login_required
+@require_POST
+@use_primary
+def mark_read_many(request):
+    """Mark the notifications listed in the POSTed ``ids`` as read."""
+    try:
+        ids = [int(notification_id) for notification_id in request.POST.getlist('ids')]
+    except ValueError:
+        ids = []
+    return _marked_read_response(request, notifications.mark_read(request.user, ids))
+
+
+@login_required
+@require_POST
+@use_primary
+def mark_all_read(request):
+    """Mark every notification of the logged-in user as read."""
+    return _marked_read_response(request, notifications.mark_read(request.user))
+
+
+@login_required
+def metrics_stats(request):
+    """Return the p50/p95/p99 request metrics of every view (staff only)."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse({
+        'sample_rate': metrics.sample_rate(),
+        'views': metrics.summary()
+    })
+
+
+def _export_bound(value):
+    if not value:
+        return None
+    moment = parse_datetime(value) or parse_datetime(f"{value}T00:00:00")
+    if moment is None:
+        raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@login_required
+def export_bids(request):
+    """
+    Stream bid history as CSV or JSON lines (staff only).
+
+    Query parameters: ``format`` (csv or jsonl), ``source`` (live, archive
+    or all), ``listing`` and the ``since``/``until`` dates or datetimes.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    export_format = request.GET.get('format', 'csv')
+    source = request.GET.get('source', 'all')
+    listing_id = request.GET.get('listing')
+    if export_format not in ('csv', 'jsonl') or source not in ('live', 'archive', 'all'):
+        return HttpResponseBadRequest("Unknown format or source.")
+    if listing_id and not listing_id.isdigit():
+        return HttpResponseBadRequest("listing must be an integer.")
+    try:
+        since = _export_bound(request.GET.get('since'))
+        until = _export_bound(request.GET.get('until'))
+    except ValueError:
+        return HttpResponseBadRequest("since and until must be dates or datetimes.")
+
+    rows = bid_rows(int(listing_id) if listing_id else None, since, until, source)
+    if export_format == 'csv':
+        response = StreamingHttpResponse(csv_lines(rows), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(jsonl_lines(rows), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="bids.{export_format}"'
+    return response
+
+
+async def listing_events(request, listing_id):
+    """Stream price changes and closure of a listing as Server-Sent Events."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for as long as the stream stays open.
+        return HttpResponse(status=204)
+    return event_stream(listing_channel(listing_id))
+
+
+async def user_events(request):
+    """Stream new notifications of the logged-in user as Server-Sent Events."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held for as long as the stream stays open.
+        return HttpResponse(status=204)
+    return event_stream(user_channel(user.id))
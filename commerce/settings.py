@@ -41,7 +41,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'auctions.routers.replica_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -50,11 +52,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fraction of requests whose timings and query counts are recorded, and
+# the number of recent samples kept per view (see auctions.metrics).
+METRICS_SAMPLE_RATE = 1.0
+METRICS_WINDOW = 1000
+
 ROOT_URLCONF = 'commerce.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to auctions.metrics.
+        'BACKEND': 'auctions.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,6 +71,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'auctions.context_processors.notifications',
+                'auctions.context_processors.live_events',
             ],
         },
     },
@@ -78,11 +88,124 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Keep connections open between requests, checking them first.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds a connection waits for a lock before failing.
+            'timeout': 20,
+            # Take the write lock when a transaction starts, so a transaction
+            # never fails upgrading a read lock while another one writes.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Aliases of read replicas of 'default'. Browse requests read from them; a
+# local replica is a SQLite copy kept fresh by `manage.py refresh_replicas`:
+#
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['auctions.routers.ReplicaRouter']
+
+# Seconds a user keeps reading from 'default' after writing.
+REPLICA_STICKY_SECONDS = 10
+
+# PRAGMA statements run on every new SQLite connection (see auctions.signals).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 2**20,
+    'cache_size': -64 * 2**10,
+    'temp_store': 'MEMORY',
+}
+
 AUTH_USER_MODEL = 'auctions.User'
 
+# Logged-in users are loaded from the user cache (see auctions.auth).
+AUTHENTICATION_BACKENDS = ['auctions.auth.CachedUserBackend']
+
+PASSWORD_HASHERS = [
+    'auctions.auth.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# PBKDF2 iterations of new password hashes; None keeps Django's default.
+# Size it with `manage.py bench_auth --target-ms`; existing hashes are
+# re-hashed with the new count when their users next log in.
+PASSWORD_HASH_ITERATIONS = None
+
+# Where sessions live: 'db' (a query per request), 'cached_db' (the
+# session cache in front of the table) or 'signed_cookies' (no server-side
+# storage; sessions cannot be revoked before they expire).
+SESSION_MODE = 'cached_db'
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared between worker processes; select it with LISTING_CARD_CACHE.
+    'files': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+}
+
+# Cache alias and lifetime (seconds) of rendered listing cards.
+LISTING_CARD_CACHE = 'default'
+LISTING_CARD_TIMEOUT = 300
+
+# Cache alias of the category catalog and per-category listing counts.
+# Shared between processes so every worker sees catalog changes.
+CATEGORY_CACHE = 'files'
+
+# Cache alias of the per-user unread notification counters. Shared
+# between processes: run_jobs and close_expired_auctions adjust them.
+NOTIFICATION_COUNT_CACHE = 'files'
+
+# Cache alias of the per-user sets of watched listing ids; shared between
+# processes so a change made in one worker drops the set for all of them.
+WATCHLIST_CACHE = 'files'
+
+# Cache aliases of sessions (in 'cached_db' mode) and logged-in users, and
+# the lifetime (seconds) of cached users. Shared between worker processes
+# so that a logout or a password change is seen by every process.
+SESSION_CACHE_ALIAS = 'files'
+USER_CACHE = 'files'
+USER_CACHE_TIMEOUT = 300
+
+# Days read notifications are kept before prune_notifications deletes them.
+NOTIFICATION_RETENTION_DAYS = 30
+
+# Days after closing before a listing's bids move to the archive table.
+BID_ARCHIVE_AFTER_DAYS = 30
+
+# Serve the read-only pages with the async views of auctions.async_views;
+# only worth it when the project runs under ASGI (commerce/asgi.py).
+ASYNC_VIEWS = False
+
+# Render the live update streams (auctions.events) into the pages. Only turn
+# on under ASGI (commerce/asgi.py): under WSGI each open stream would hold a
+# worker for as long as the page stays open.
+LIVE_EVENTS = False
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 